@@ -0,0 +1,216 @@
+"""
+Offline benchmark of analysis stages on synthetic 1C databases.
+
+Relations and structure file are generated deterministically, database access is replaced with fake psycopg2
+from tests/conftest.py returning generated rows, so only package code is measured. Each stage is timed,
+then run again on fresh inputs under tracemalloc, peak memory is the peak of that second run. Results can be
+saved as baseline and compared on later runs.
+
+    python benchmarks/bench_db_size_analysis.py --relations 10000 100000 --save-baseline baseline.json
+    python benchmarks/bench_db_size_analysis.py --relations 10000 100000 --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_size_analysis_1c_psql import db_size_analysis_1c_psql as analysis  # noqa: E402
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject  # noqa: E402
+from db_size_analysis_1c_psql.data_base_tree_builder import get_tree_keys  # noqa: E402
+from db_size_analysis_1c_psql.name_parser import parse_relation  # noqa: E402
+from db_size_analysis_1c_psql.safe_list import SafeList  # noqa: E402
+from tests.conftest import FakePsycopg2  # noqa: E402
+
+# metadata class: (DBMS prefix, 1C name, share of objects, tabular sections per object)
+METADATA_CLASSES: tuple = (('_document', 'Document', 0.35, 3),
+                           ('_reference', 'Catalog', 0.25, 1),
+                           ('_accumrg', 'AccumulationRegister', 0.15, 0),
+                           ('_inforg', 'InformationRegister', 0.2, 0),
+                           ('_const', 'Constant', 0.05, 0))
+SERVICE_RELATIONS: tuple = ('config', 'configsave', 'params', 'files', 'dbschema', '_yearoffset', '_usersworkhistory')
+EXCEL_MAX_RELATIONS: int = 200000
+
+
+def generate_database(relations: int, seed: int = 0) -> tuple:
+    """
+    :return: (rows (relation, total_size) as returned by database, structure file elements)
+    """
+    random_generator: random.Random = random.Random(seed)
+    rows: list = []
+    struct_1c: dict = dict()
+    number: int = 0
+    for relation in SERVICE_RELATIONS:
+        rows.append((f'public.{relation}', random_generator.randint(8192, 1 << 24)))
+        struct_1c[relation] = {'table_name_dbms': relation,
+                               'table_name_1c': '',
+                               'metadata': '',
+                               'purpose': '',
+                               'fields': {},
+                               'index': {}}
+    while len(rows) < relations:
+        for prefix, name_1c, share, tabular_sections in METADATA_CLASSES:
+            for _ in range(max(1, round(share * 10))):
+                number += 1
+                metadata: str = f'{name_1c}.{name_1c}{number}'
+                tables: list = [(f'{prefix}{number}', metadata, 'Main', '')]
+                if prefix == '_accumrg':
+                    tables.append((f'{prefix}t{number}', metadata, 'Totals', 'Totals'))
+                for section in range(tabular_sections):
+                    tables.append((f'{prefix}{number}_vt{number * 10 + section}',
+                                   metadata,
+                                   'TabularSection',
+                                   f'TabularSection.Items{section}'))
+                for table_name, table_metadata, purpose, table_suffix in tables:
+                    rows.append((f'public.{table_name}', int(random_generator.paretovariate(1.2) * 8192)))
+                    struct_1c[table_name] = {
+                        'table_name_dbms': f'_{table_name[1:].capitalize()}',
+                        'table_name_1c': f'{table_metadata}.{table_suffix}' if table_suffix else table_metadata,
+                        'metadata': table_metadata,
+                        'purpose': purpose,
+                        'fields': {f'_fld{field}': {'name': f'Field{field}', 'type': 'N'} for field in range(4)},
+                        'index': {f'{table_name}_byid': ['_idrref']}}
+    rows: list = rows[:relations]
+    rows.sort(key=lambda row: row[0])
+    return rows, struct_1c
+
+
+def measure(function, setup=None, memory: bool = True) -> tuple:
+    """
+    :param setup: returns arguments of function, called before every run and not measured, so both runs
+                  get the same fresh inputs (optional)
+    :return: (result of first run, seconds, peak bytes allocated during second run or None)
+    """
+    args: tuple = () if setup is None else setup()
+    start: float = time.perf_counter()
+    result = function(*args)
+    seconds: float = time.perf_counter() - start
+    if not memory:
+        return result, seconds, None
+    args = () if setup is None else setup()
+    tracemalloc.start()
+    function(*args)
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(relations: int, work_dir: str, memory: bool = True) -> dict:
+    """
+    :return: dict{stage: {'seconds': float, 'peak': int or None, 'rows': int}}
+    """
+    rows, struct_1c = generate_database(relations)
+    struct_path: str = os.path.join(work_dir, f'struct_{relations}.json')
+    with open(struct_path, 'w', encoding='utf-8') as file:
+        json.dump(struct_1c, file, ensure_ascii=False)
+    del struct_1c
+    results: dict = dict()
+
+    def stage(name: str, function, setup=None):
+        result, seconds, peak = measure(function, setup, memory)
+        results[name] = {'seconds': seconds, 'peak': peak, 'rows': relations}
+        return result
+
+    def get_db_objects() -> SafeList:
+        parse_relation.cache_clear()
+        psycopg2 = analysis.psycopg2
+        analysis.psycopg2 = FakePsycopg2(rows)
+        try:
+            return analysis.get_psql_objects_with_size('', '', '', '')
+        finally:
+            analysis.psycopg2 = psycopg2
+
+    stage('parse_rows', get_db_objects)
+    struct_1c: dict = stage('load_struct', lambda: analysis.load_1c_database_struct(struct_path))
+
+    def get_compiled_db_objects() -> tuple:
+        return analysis.compile_db_objects_with_1c_struct(get_db_objects(), struct_1c),
+
+    def add_data_levels(db_objects: SafeList) -> DataBaseObject:
+        tree: DataBaseObject = DataBaseObject('DataBase')
+        for db_object in db_objects:
+            tree.add_data_level(get_tree_keys(db_object), db_object)
+        return tree
+
+    data: DataBaseObject = stage('compile_tree',
+                                 lambda db_objects: analysis.compile_db_objects_with_1c_struct(db_objects, struct_1c,
+                                                                                               True),
+                                 lambda: (get_db_objects(),))
+    stage('add_data_level', add_data_levels, get_compiled_db_objects)
+    stage('sort', lambda tree: tree.sort('size', True),
+          lambda: (analysis.compile_db_objects_with_1c_struct(get_db_objects(), struct_1c, True),))
+    data.sort('size', True)
+    json_path: str = os.path.join(work_dir, f'export_{relations}.json')
+    stage('export_to_json', lambda: data.export_to_json(json_path))
+    if relations <= EXCEL_MAX_RELATIONS:
+        excel_path: str = os.path.join(work_dir, f'export_{relations}.xlsx')
+        stage('export_to_excel', lambda: data.export_to_excel(excel_path, write_only=True))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :return: list[str] of regressions - time or peak memory exceeding baseline by more than threshold share
+    """
+    regressions: list = []
+    for relations, stages in results.items():
+        for stage_name, result in stages.items():
+            base: dict = baseline.get(relations, dict()).get(stage_name)
+            if base is None:
+                continue
+            for metric in ('seconds', 'peak'):
+                if result[metric] is None or base.get(metric) is None or base[metric] == 0:
+                    continue
+                ratio: float = result[metric] / base[metric]
+                if ratio > 1 + threshold:
+                    regressions.append(f'{relations} {stage_name} {metric}: '
+                                       f'{base[metric]:.4g} -> {result[metric]:.4g} (x{ratio:.2f})')
+    return regressions
+
+
+def print_results(results: dict):
+    for relations, stages in results.items():
+        for stage_name, result in stages.items():
+            peak: str = '' if result['peak'] is None else f'{result["peak"] / (1 << 20):.1f}'
+            print(f'{relations:>10} {stage_name:<16} {result["seconds"]:>10.3f} '
+                  f'{result["rows"] / max(result["seconds"], 1e-9):>12.0f} {peak:>10}')
+
+
+def main(args: list = None) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--relations', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='numbers of relations of synthetic databases')
+    parser.add_argument('--baseline', help='compare with baseline file, exit code is 1 on regressions')
+    parser.add_argument('--save-baseline', help='save results as baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed time and memory growth against baseline (default 0.2)')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc pass of stages')
+    parser.add_argument('--work-dir', help='directory for generated and exported files (temporary by default)')
+    options: argparse.Namespace = parser.parse_args(args)
+    results: dict = dict()
+    print(f'{"relations":>10} {"stage":<16} {"seconds":>10} {"rows/s":>12} {"peak MB":>10}')
+    if options.work_dir:
+        os.makedirs(options.work_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for relations in options.relations:
+            results[str(relations)] = run(relations, options.work_dir or temp_dir, not options.no_memory)
+            print_results({str(relations): results[str(relations)]})
+    if options.save_baseline:
+        with open(options.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as file:
+            regressions: list = compare(results, json.load(file), options.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,7 @@
 from .db_size_analysis_1c_psql import create_db_size_analysis
+from .db_size_analysis_1c_psql import create_multiple_db_size_analysis
+from .snapshot import Snapshot, diff_snapshots, load_snapshots
+from .db_size_analysis_1c_psql_async import create_db_size_analysis_async
+from .db_size_analysis_1c_psql_async import create_multiple_db_size_analysis_async
+from .instrumentation import Instrumentation, StageMetrics
+from .incremental_analysis import IncrementalAnalysis
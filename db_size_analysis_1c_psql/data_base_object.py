@@ -1,13 +1,85 @@
+import csv
+import heapq
 import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 from .excel_processor import ExcelProcessor
+from .instrumentation import Instrumentation, measure_stage
 from .safe_list import SafeList
 
+_NO_CHILDREN: MappingProxyType = MappingProxyType(dict())
+_UNSAFE_FILE_NAME: re.Pattern = re.compile(r'[^\w.-]')
+
 
 class DataBaseObject:
-    name: str
-    children: dict
+    """
+    Tree node with fixed attribute slots. Full name is built from parent names on demand,
+    leaves do not allocate children dict.
+    """
+    __slots__ = ('__key',
+                 '__parent',
+                 '__children',
+                 '__attributes',
+                 'size',
+                 'heap_size',
+                 'toast_size',
+                 'indexes_size',
+                 'bloat_size',
+                 'namespace',
+                 'parent_object',
+                 'object',
+                 'table_name_dbms',
+                 'table_name_1c',
+                 'metadata',
+                 'purpose',
+                 'fields',
+                 'index')
+    attribute_names: tuple = ('namespace',
+                              'parent_object',
+                              'object',
+                              'table_name_dbms',
+                              'table_name_1c',
+                              'metadata',
+                              'purpose',
+                              'fields',
+                              'index')
+    excel_header: tuple = ('Name',
+                           'Size',
+                           'Namespase',
+                           'DBMS table name',
+                           '1C table name',
+                           'Metadata',
+                           'Purpose')
+    excel_components_header: tuple = ('Heap size',
+                                      'TOAST size',
+                                      'Indexes size',
+                                      'Bloat estimate')
+    flat_header: tuple = ('path',
+                          'depth',
+                          'size',
+                          'table_name_dbms',
+                          'table_name_1c',
+                          'metadata',
+                          'purpose')
+    flat_components_header: tuple = ('heap_size',
+                                     'toast_size',
+                                     'indexes_size',
+                                     'bloat_size')
     size: int
+    heap_size: int
+    toast_size: int
+    indexes_size: int
+    bloat_size: int
     namespace: str
     parent_object: str
     object: str
@@ -20,36 +92,129 @@ class DataBaseObject:
 
     def __init__(self, name: str = None, size: int = 0, **kwargs):
         super().__init__()
-        self.name: str = name
+        self.__key: str = None if name is None else sys.intern(name)
+        self.__parent: DataBaseObject = None
+        self.__children: dict = None
+        self.__attributes: dict = None
         self.size: int = size
-        self.children: dict = dict()
+        self.heap_size: int = 0
+        self.toast_size: int = 0
+        self.indexes_size: int = 0
+        self.bloat_size: int = 0
         self.set_attributes(**kwargs)
 
+    @property
+    def name(self) -> str:
+        if self.__parent is None:
+            return self.__key
+        return f'{self.__parent.name}.{self.__key}'
+
+    @name.setter
+    def name(self, value: str):
+        if self.__parent is not None:
+            raise AttributeError('name of linked object is its key in parent')
+        self.__key = None if value is None else sys.intern(value)
+
+    @property
+    def key(self) -> str:
+        return self.__key
+
+    @property
+    def parent(self):
+        return self.__parent
+
+    @property
+    def children(self) -> dict:
+        if self.__children is None:
+            return _NO_CHILDREN
+        return self.__children
+
+    @children.setter
+    def children(self, value: dict):
+        self.__children = None
+        for key, child in value.items():
+            self[key] = child
+
     def get(self, key, default=None):
-        return self.children.get(key, default)
+        if self.__children is None:
+            return default
+        return self.__children.get(key, default)
 
     def set_attributes(self, **kwargs):
         for key, value in kwargs.items():
             if value is not None:
                 if not (type(value) == dict and len(value) == 0):
-                    self.__setattr__(key, value)
+                    try:
+                        self.__setattr__(key, value)
+                    except AttributeError:
+                        if self.__attributes is None:
+                            self.__attributes = dict()
+                        self.__attributes[key] = value
 
     def get_attribute(self, name: str, default=None):
         try:
             return self.__getattribute__(name)
         except AttributeError:
-            return default
+            if self.__attributes is None:
+                return default
+            return self.__attributes.get(name, default)
+
+    def get_attributes(self) -> dict:
+        """
+        :return: dict of defined attributes except name, sizes and children
+        """
+        attributes: dict = dict()
+        for name in self.attribute_names:
+            try:
+                attributes[name] = self.__getattribute__(name)
+            except AttributeError:
+                continue
+        if self.__attributes is not None:
+            attributes.update(self.__attributes)
+        return attributes
+
+    def to_dict(self) -> dict:
+        data: dict = {'name': self.name, 'size': self.size, 'children': dict(self.children)}
+        if self.has_components():
+            data.update(heap_size=self.heap_size,
+                        toast_size=self.toast_size,
+                        indexes_size=self.indexes_size,
+                        bloat_size=self.bloat_size)
+        data.update(self.get_attributes())
+        return data
+
+    def has_components(self) -> bool:
+        return self.heap_size != 0 or self.toast_size != 0 or self.indexes_size != 0
+
+    def add_size(self, data_base_object):
+        """
+        Add size and size components of other object.
+        """
+        self.size += data_base_object.size
+        self.heap_size += data_base_object.heap_size
+        self.toast_size += data_base_object.toast_size
+        self.indexes_size += data_base_object.indexes_size
+        self.bloat_size += data_base_object.bloat_size
+
+    def set_size(self, data_base_object):
+        """
+        Set size and size components from other object.
+        """
+        self.size = data_base_object.size
+        self.heap_size = data_base_object.heap_size
+        self.toast_size = data_base_object.toast_size
+        self.indexes_size = data_base_object.indexes_size
+        self.bloat_size = data_base_object.bloat_size
 
     def add_data_level(self, keys: SafeList, db_object):
-        try:
-            key: str = keys.pop(0)
-        except IndexError:
-            self.set_attributes(**db_object.__dict__)
-            return
-        self.size += db_object.size
-        if self.get(key) is None:
-            self[key]: DataBaseObject = DataBaseObject(f'{self.name}.{key}')
-        self[key].add_data_level(keys, db_object)
+        data_base_object: DataBaseObject = self
+        for key in keys:
+            data_base_object.add_size(db_object)
+            if data_base_object.get(key) is None:
+                data_base_object[key] = DataBaseObject()
+            data_base_object = data_base_object[key]
+        data_base_object.set_size(db_object)
+        data_base_object.set_attributes(**db_object.get_attributes())
 
     def sort(self, key: str, reverse: bool = False):
         if len(self.children) == 0:
@@ -57,10 +222,77 @@ class DataBaseObject:
         sorted_children: list = sorted(self.children.items(),
                                        key=lambda element: element[1].get_attribute(key),
                                        reverse=reverse)
-        self.children = dict(sorted_children)
+        self.__children = dict(sorted_children)
         for child in self.children.values():
             child.sort(key, reverse)
 
+    def prune(self, top: int = None, min_size: int = 0, max_depth: int = None, other_name: str = 'Other'):
+        """
+        Build reduced copy of tree. At every level only top largest children not smaller than min_size are kept
+        sorted by size descending, the rest are folded into other_name child. Pruned subtrees are not visited.
+
+        :param top: children kept per object (optional, all by default)
+        :param min_size: minimum size of kept child (optional, default to 0)
+        :param max_depth: depth of kept tree, root depth is 0 (optional, not limited by default)
+        :param other_name: name of folded children object, numbered "Other (2)" if a child has the same name
+                           (optional, default to "Other")
+        :return: new tree, original tree is not changed
+        """
+        data: DataBaseObject = self.__copy()
+        stack: list = [(self, data, 0)]
+        while len(stack) > 0:
+            source, target, depth = stack.pop()
+            if len(source.children) == 0 or (max_depth is not None and depth >= max_depth):
+                continue
+            candidates: list = [(key, child) for key, child in source.children.items() if child.size >= min_size]
+            if top is None:
+                kept: list = sorted(candidates, key=lambda element: element[1].size, reverse=True)
+            else:
+                kept: list = heapq.nlargest(top, candidates, key=lambda element: element[1].size)
+            for key, child in kept:
+                target[key] = child.__copy()
+                stack.append((child, target[key], depth + 1))
+            if len(kept) < len(source.children):
+                other: DataBaseObject = DataBaseObject()
+                kept_keys: set = {key for key, child in kept}
+                for key, child in source.children.items():
+                    if key not in kept_keys:
+                        other.add_size(child)
+                name: str = other_name
+                number: int = 1
+                while name in source.children:
+                    number += 1
+                    name = f'{other_name} ({number})'
+                target[name] = other
+        return data
+
+    def __copy(self, payloads: bool = True):
+        """
+        :param payloads: copy "fields" and "index" attributes (optional, default to True)
+        :return: copy of object without children
+        """
+        data_base_object: DataBaseObject = DataBaseObject(self.__key)
+        data_base_object.set_size(self)
+        attributes: dict = self.get_attributes()
+        if not payloads:
+            attributes.pop('fields', None)
+            attributes.pop('index', None)
+        data_base_object.set_attributes(**attributes)
+        return data_base_object
+
+    def __copy_tree_without_payloads(self):
+        """
+        :return: copy of subtree without "fields" and "index" attributes, which are not exported to Excel
+        """
+        data: DataBaseObject = self.__copy(False)
+        stack: list = [(self, data)]
+        while len(stack) > 0:
+            source, target = stack.pop()
+            for key, child in source.children.items():
+                target[key] = child.__copy(False)
+                stack.append((child, target[key]))
+        return data
+
     def print(self, max_level: int = 99, level: int = 0):
         print('\t' * level + str(self))
         if level == max_level:
@@ -68,66 +300,310 @@ class DataBaseObject:
         for child in self.children.values():
             child.print(max_level, level + 1)
 
-    def export_to_json(self, file_path: str):
+    def export_to_json(self, file_path: str, indent: int = 4):
+        """
+        :param indent: JSON indent, None for compact output (optional, default to 4)
+        """
         with open(file_path, "w", encoding='utf-8') as write_file:
-            json.dump(self, write_file, default=lambda x: x.__dict__, indent=4, ensure_ascii=False)
+            json.dump(self, write_file, default=lambda x: x.to_dict(), indent=indent, ensure_ascii=False,
+                      separators=None if indent is not None else (',', ':'))
 
-    def export_to_excel(self, file_path: str = None, excel: ExcelProcessor = None, tree_level: int = 1) \
-            -> str or tuple:
+    def iter_flat_rows(self, components: bool = False):
+        """
+        Depth-first walk of tree, path is dot-joined keys from this object.
+
+        :param components: add heap, TOAST, indexes and bloat estimate sizes (optional, default to False)
+        :return: generator of rows in flat_header (and flat_components_header) order
+        """
+        stack: list = [(self, self.__key or '', 0)]
+        while len(stack) > 0:
+            data_base_object, path, depth = stack.pop()
+            row: tuple = (path,
+                          depth,
+                          data_base_object.size,
+                          data_base_object.get_attribute('table_name_dbms', ''),
+                          data_base_object.get_attribute('table_name_1c', ''),
+                          data_base_object.get_attribute('metadata', ''),
+                          data_base_object.get_attribute('purpose', ''))
+            if components:
+                row += (data_base_object.heap_size,
+                        data_base_object.toast_size,
+                        data_base_object.indexes_size,
+                        data_base_object.bloat_size)
+            yield row
+            for key, child in reversed(data_base_object.children.items()):
+                stack.append((child, f'{path}.{key}', depth + 1))
+
+    def export_to_csv(self, file_path: str, delimiter: str = ',', components: bool = None) -> str:
+        """
+        One row per tree object, rows are written while tree is walked.
+
+        :param delimiter: CSV delimiter (optional, default to ",")
+        :param components: add size components columns (optional, by default if sizes components are collected)
+        """
+        if components is None:
+            components: bool = self.has_components()
+        with open(file_path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file, delimiter=delimiter)
+            writer.writerow(self.flat_header + (self.flat_components_header if components else ()))
+            writer.writerows(self.iter_flat_rows(components))
+        return file_path
+
+    def export_to_parquet(self, file_path: str, batch_size: int = 65536, components: bool = None) -> str:
+        """
+        Same rows as export_to_csv written to Parquet file by row groups, requires pyarrow.
+
+        :param batch_size: rows per row group (optional, default to 65536)
+        :param components: add size components columns (optional, by default if sizes components are collected)
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required for parquet export')
+        if components is None:
+            components: bool = self.has_components()
+        fields: list = [('path', pyarrow.string()),
+                        ('depth', pyarrow.int32()),
+                        ('size', pyarrow.int64()),
+                        ('table_name_dbms', pyarrow.string()),
+                        ('table_name_1c', pyarrow.string()),
+                        ('metadata', pyarrow.string()),
+                        ('purpose', pyarrow.string())]
+        if components:
+            fields.extend((name, pyarrow.int64()) for name in self.flat_components_header)
+        schema = pyarrow.schema(fields)
+        with pyarrow.parquet.ParquetWriter(file_path, schema) as writer:
+            batch: list = []
+            for row in self.iter_flat_rows(components):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    writer.write_table(self.__get_parquet_table(batch, schema))
+                    batch = []
+            if len(batch) > 0:
+                writer.write_table(self.__get_parquet_table(batch, schema))
+        return file_path
+
+    @staticmethod
+    def __get_parquet_table(rows: list, schema):
+        return pyarrow.Table.from_arrays([pyarrow.array(column, type=field.type)
+                                          for column, field in zip(zip(*rows), schema)],
+                                         schema=schema)
+
+    def export_to_excel(self, file_path: str = None, excel: ExcelProcessor = None, tree_level: int = 1,
+                        write_only: bool = False, components: bool = None,
+                        instrumentation: Instrumentation = None, name_prefix: str = None) -> str or ExcelProcessor:
+        """
+        :param file_path: result workbook path, workbook is saved if defined
+        :param excel: excel processor to add rows to (optional, new workbook with header by default)
+        :param tree_level: tree level of object, defines font size (optional, default to 1)
+        :param write_only: stream rows into write-only workbook, memory usage does not depend on tree size
+                           (optional, default to False)
+        :param components: add heap, TOAST, indexes and bloat estimate columns
+                           (optional, by default if sizes components are collected)
+        :param instrumentation: measure stages "excel_rows" and "excel_save" (optional)
+        :param name_prefix: full name of parent, prepended to names of rows when object is exported
+                            apart from its tree (optional)
+        :return: file_path if workbook is saved, excel processor otherwise
+        """
+        if components is None:
+            components: bool = self.has_components()
+        if write_only:
+            if file_path is None:
+                raise TypeError('file_path must be defined')
+            return self.__export_to_excel_write_only(file_path, components, instrumentation, name_prefix)
         if excel is None:
             if file_path is None:
                 raise TypeError('file_path or excel must be defined')
             excel: ExcelProcessor = ExcelProcessor()
-            excel.add_row('Name',
-                          'Size',
-                          'Namespase',
-                          'DBMS table name',
-                          '1C table name',
-                          'Metadata',
-                          'Purpose').font_style(size=16, bold=True, italic=True).set_wrap_text()
-        row = excel.add_row(*self.__get_excel_row())
-        children_index: SafeList = SafeList()
-        first_index = last_index = row.index
-        for child in self.children.values():
-            child_row, child_index = child.export_to_excel(excel=excel, tree_level=tree_level + 1)
-            last_index = child_row.index
-            children_index.append(child_index)
-        if first_index != last_index:
-            first_index += 1
-        if len(self.children) > 0:
-            row.font_style(size=18 - tree_level * 2, italic=True)
-            last_index = excel.add_row().index
-        else:
-            row.font_style(size=18 - tree_level * 2)
-        if tree_level == 1:
+            excel.add_row(*self.__get_excel_header(components)) \
+                .font_style(size=16, bold=True, italic=True).set_wrap_text()
+        with measure_stage(instrumentation, 'excel_rows') as metrics:
+            metrics.rows = 0
+            outline_levels: dict = dict()
+            stack: list = [(self, tree_level)]
+            while len(stack) > 0:
+                data_base_object, level = stack.pop()
+                if data_base_object is None:
+                    outline_levels[excel.add_row().index] = level - tree_level + 1
+                    continue
+                row = excel.add_row(*data_base_object.__get_excel_row(components, name_prefix))
+                metrics.rows += 1
+                if level > tree_level:
+                    outline_levels[row.index] = level - tree_level
+                if len(data_base_object.children) > 0:
+                    row.font_style(size=18 - level * 2, italic=True)
+                    stack.append((None, level))
+                    for child in reversed(data_base_object.children.values()):
+                        stack.append((child, level + 1))
+                else:
+                    row.font_style(size=18 - level * 2)
+            excel.set_rows_outline_levels(outline_levels)
+        if file_path is None:
+            return excel
+        with measure_stage(instrumentation, 'excel_save'):
             excel.set_optimal_column_widths()
-            excel.create_rows_tree(first_index, last_index, children_index)
             return excel.save(file_path)
-        else:
-            return row, {'start': first_index, 'end': last_index, 'children_index': children_index}
 
-    def get_format_size(self) -> str:
+    def export_to_excel_parts(self, directory: str, max_workers: int = None, components: bool = None,
+                              index_file_name: str = 'index.xlsx') -> str:
+        """
+        Every child is exported to its own write-only workbook in a separate process, index workbook lists
+        children with sizes and workbook file names. Processes get copies of children without "fields"
+        and "index" attributes.
+
+        :param directory: directory for workbooks, created if not exists
+        :param max_workers: maximum number of processes (optional, default to number of processors)
+        :param components: add heap, TOAST, indexes and bloat estimate columns
+                           (optional, by default if sizes components are collected)
+        :param index_file_name: file name of index workbook (optional, default to "index.xlsx")
+        :return: index workbook path
+        """
+        if components is None:
+            components: bool = self.has_components()
+        os.makedirs(directory, exist_ok=True)
+        file_names: dict = dict()
+        for number, key in enumerate(self.children, 1):
+            file_names[key] = f'{number:03}_{re.sub(_UNSAFE_FILE_NAME, "_", key)}.xlsx'
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures: list = [executor.submit(_export_excel_part, child.__copy_tree_without_payloads(), self.name,
+                                             os.path.join(directory, file_names[key]), components)
+                             for key, child in self.children.items()]
+            for future in futures:
+                future.result()
+        excel: ExcelProcessor = ExcelProcessor()
+        excel.add_row('Name', 'Size', 'File').font_style(size=16, bold=True, italic=True).set_wrap_text()
+        excel.add_row(self.name, self.get_format_size()).font_style(size=14, italic=True)
+        for key, child in self.children.items():
+            excel.add_row(child.name, child.get_format_size(), file_names[key]).font_style(size=12)
+        excel.set_optimal_column_widths()
+        return excel.save(os.path.join(directory, index_file_name))
+
+    def __export_to_excel_write_only(self, file_path: str, components: bool = False,
+                                     instrumentation: Instrumentation = None, name_prefix: str = None) -> str:
+        """
+        Rows are written to the stream while "excel_rows" stage is measured, "excel_save" is compression
+        of the rest of the workbook.
+        """
+        with measure_stage(instrumentation, 'excel_rows') as metrics:
+            excel, metrics.rows = self.__write_excel_rows(components, name_prefix)
+        with measure_stage(instrumentation, 'excel_save'):
+            return excel.save(file_path)
+
+    def __write_excel_rows(self, components: bool = False, name_prefix: str = None) -> tuple:
+        """
+        :return: (write-only excel processor, number of object rows)
+        """
+        excel: ExcelProcessor = ExcelProcessor(write_only=True)
+        excel.measure_row(*self.__get_excel_header(components))
+        rows: int = 0
+        stack: list = [self]
+        while len(stack) > 0:
+            data_base_object: DataBaseObject = stack.pop()
+            excel.measure_row(*data_base_object.__get_excel_row(components, name_prefix))
+            rows += 1
+            stack.extend(data_base_object.children.values())
+        excel.set_optimal_column_widths()
+        excel.add_named_style('header', wrap_text=True, size=16, bold=True, italic=True)
+        excel.append_row(*self.__get_excel_header(components), style='header')
+        styles: set = set()
+        stack: list = [(self, 1)]
+        while len(stack) > 0:
+            data_base_object, tree_level = stack.pop()
+            if data_base_object is None:
+                excel.append_row(outline_level=tree_level, hidden=True)
+                continue
+            has_children: bool = len(data_base_object.children) > 0
+            style: str = f'level_{tree_level}_group' if has_children else f'level_{tree_level}'
+            if style not in styles:
+                if has_children:
+                    excel.add_named_style(style, size=18 - tree_level * 2, italic=True)
+                else:
+                    excel.add_named_style(style, size=18 - tree_level * 2)
+                styles.add(style)
+            excel.append_row(*data_base_object.__get_excel_row(components, name_prefix),
+                             style=style,
+                             outline_level=tree_level - 1,
+                             hidden=tree_level > 1)
+            if has_children:
+                stack.append((None, tree_level))
+                for child in reversed(data_base_object.children.values()):
+                    stack.append((child, tree_level + 1))
+        return excel, rows
+
+    def get_format_size(self, size: int = None) -> str:
+        """
+        :param size: size to be formatted (optional, default to object size)
+        """
         prefix_list: list = ['', 'k', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y']
         index: int = 0
-        while self.size > 1024:
-            self.size /= 1024
+        size: float = self.size if size is None else size
+        while size > 1024:
+            size /= 1024
             index += 1
-        return f'{round(self.size, 2)} {prefix_list[index]}B'
+        return f'{round(size, 2)} {prefix_list[index]}B'
+
+    def __get_excel_header(self, components: bool = False) -> tuple:
+        if components:
+            return self.excel_header + self.excel_components_header
+        return self.excel_header
 
-    def __get_excel_row(self) -> tuple:
-        return self.get_attribute('name', ''), \
-               self.get_format_size(), \
-               self.get_attribute('namespase', ''), \
-               self.get_attribute('table_name_dbms', ''), \
-               self.get_attribute('table_name_1c', ''), \
-               self.get_attribute('metadata', ''), \
-               self.get_attribute('purpose', '')
+    def __get_excel_row(self, components: bool = False, name_prefix: str = None) -> tuple:
+        name: str = self.get_attribute('name', '')
+        if name_prefix is not None:
+            name = f'{name_prefix}.{name}'
+        row: tuple = name, \
+            self.get_format_size(), \
+            self.get_attribute('namespase', ''), \
+            self.get_attribute('table_name_dbms', ''), \
+            self.get_attribute('table_name_1c', ''), \
+            self.get_attribute('metadata', ''), \
+            self.get_attribute('purpose', '')
+        if components:
+            return row + (self.get_format_size(self.heap_size),
+                          self.get_format_size(self.toast_size),
+                          self.get_format_size(self.indexes_size),
+                          self.get_format_size(self.bloat_size))
+        return row
 
     def __str__(self):
         return f'{self.name} | {self.get_format_size()}'
 
+    def __getstate__(self) -> tuple:
+        """
+        Parent link is not pickled, so subtree is sent to other process without the rest of tree.
+        """
+        return (self.__key, self.size, self.heap_size, self.toast_size, self.indexes_size, self.bloat_size,
+                self.get_attributes(), self.__children)
+
+    def __setstate__(self, state: tuple):
+        key, self.size, self.heap_size, self.toast_size, self.indexes_size, self.bloat_size, attributes, \
+            children = state
+        self.__key = None if key is None else sys.intern(key)
+        self.__parent = None
+        self.__children = None
+        self.__attributes = None
+        self.set_attributes(**attributes)
+        if children is not None:
+            self.children = children
+
     def __getitem__(self, item):
         return self.children[item]
 
     def __setitem__(self, key, value):
-        self.children[key] = value
+        if self.__children is None:
+            self.__children = dict()
+        value.__key = sys.intern(key)
+        value.__parent = self
+        self.__children[value.__key] = value
+
+    def __delitem__(self, key):
+        self.children[key].__parent = None
+        del self.__children[key]
+        if len(self.__children) == 0:
+            self.__children = None
+
+
+def _export_excel_part(data_base_object: DataBaseObject, name_prefix: str, file_path: str, components: bool) -> str:
+    """
+    :param name_prefix: full name of parent in source tree, parent link is lost when object is sent to process
+    """
+    return data_base_object.export_to_excel(file_path, write_only=True, components=components,
+                                            name_prefix=name_prefix)
@@ -0,0 +1,62 @@
+from .data_base_object import DataBaseObject
+
+
+class DataBaseTreeBuilder:
+    """
+    Nodes are indexed by path tuple while objects are added, subtree sizes are summed in one bottom-up pass
+    and parents are linked when tree is built.
+    """
+
+    def __init__(self, name: str = 'DataBase'):
+        self.__name: str = name
+        self.__nodes: dict = {(): DataBaseObject(name)}
+        self.__links: list = []
+
+    def add(self, keys: tuple, db_object: DataBaseObject):
+        """
+        First object of path becomes tree node itself, sizes and attributes of next objects of the same path
+        are added to it, so added objects are changed and must not be reused.
+
+        :param keys: path of object in tree
+        :param db_object: object with size and attributes
+        """
+        node: DataBaseObject = self.__nodes.get(keys)
+        if node is None:
+            self.__add_node(keys, db_object)
+        else:
+            node.add_size(db_object)
+            node.set_attributes(**db_object.get_attributes())
+
+    def __add_node(self, keys: tuple, node: DataBaseObject):
+        parent: DataBaseObject = self.__nodes.get(keys[:-1])
+        if parent is None:
+            parent = DataBaseObject()
+            self.__add_node(keys[:-1], parent)
+        self.__nodes[keys] = node
+        self.__links.append((keys[-1], node, parent))
+
+    def build(self) -> DataBaseObject:
+        """
+        Builder is reset after tree is built.
+        """
+        for key, node, parent in reversed(self.__links):
+            parent.add_size(node)
+        for key, node, parent in self.__links:
+            parent[key] = node
+        data: DataBaseObject = self.__nodes[()]
+        self.__nodes = {(): DataBaseObject(self.__name)}
+        self.__links = []
+        return data
+
+
+def get_tree_keys(db_object: DataBaseObject) -> tuple:
+    """
+    :return: path of object in tree: 1C table name, metadata with purpose or ('Service', DBMS object)
+    """
+    if hasattr(db_object, 'table_name_1c') and db_object.table_name_1c != '':
+        return tuple(db_object.table_name_1c.split('.'))
+    elif hasattr(db_object, 'metadata') and db_object.metadata != '':
+        if hasattr(db_object, 'purpose') and db_object.purpose != '':
+            return (*db_object.metadata.split('.'), db_object.purpose)
+        return tuple(db_object.metadata.split('.'))
+    return 'Service', db_object.object
@@ -1,63 +1,326 @@
 import psycopg2
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import closing
 import json
 from .data_base_object import DataBaseObject
+from .data_base_tree_builder import DataBaseTreeBuilder, get_tree_keys
+from .instrumentation import Instrumentation, StageMetrics, measure_stage
+from .name_parser import parse_relation, parse_relations
 from .safe_list import SafeList
+from .struct_1c import LazyStructPayload, PAYLOAD_NAMES, Struct1CCache, iter_1c_database_struct
 
 
-def get_psql_objects_with_size(host: str, database: str, user: str, password: str) -> SafeList:
+def get_psql_objects_with_size(host: str, database: str, user: str, password: str,
+                               server_side_parsing: bool = False, aggregate: bool = False,
+                               estimate: bool = False, components: bool = False) -> SafeList:
+    """
+    :param server_side_parsing: split relation names into namespace/parent object/object with SQL regexes
+                                (optional, default to False)
+    :param aggregate: sum sizes of relations with the same 1C object on server, implies server_side_parsing
+                      (optional, default to False)
+    :param estimate: approximate sizes from catalog statistics (relpages of table, TOAST and indexes)
+                     instead of measuring relation files (optional, default to False)
+    :param components: collect heap, TOAST, indexes and bloat estimate sizes in the same query
+                       (optional, default to False)
+    """
+    server_side_parsing: bool = server_side_parsing or aggregate
     with closing(psycopg2.connect(host=host, dbname=database, user=user, password=password)) as conn:
-        request: str = "SELECT nspname || '.' || relname AS \"relation\", " \
-                       "pg_total_relation_size(C.oid) AS \"total_size\" " \
-                       "FROM pg_class C " \
-                       "LEFT JOIN pg_namespace N ON (N.oid = C.relnamespace) " \
-                       "WHERE nspname NOT IN ('pg_catalog', 'information_schema') " \
-                       "AND C.relkind <> 'i' " \
-                       "AND nspname !~ '^pg_toast' " \
-                       "ORDER BY nspname || '.' || relname;"
-        db_objects: SafeList = SafeList()
         with conn.cursor() as cursor:
-            cursor.execute(request)
-            for row in cursor:
-                row: tuple[str, int]
-                names: SafeList[str] = SafeList(row[0].replace('_', '._').split('.'))
-                db_objects.append(DataBaseObject(namespace=names.get(0),
-                                                 parent_object=names.get(2),
-                                                 object=names.get(2, names.get(1)) + names.get(3, ''),
-                                                 size=row[1]))
+            cursor.execute(get_psql_objects_request(server_side_parsing, aggregate, estimate, components))
+            rows: list = cursor.fetchall()
+    db_objects: SafeList = SafeList()
+    if server_side_parsing:
+        for row in rows:
+            db_objects.append(create_db_object(row, True, components))
+    else:
+        for row, namespace, parent_object, object_name in zip(rows, *parse_relations([row[0] for row in rows])):
+            db_object: DataBaseObject = DataBaseObject(namespace=namespace, parent_object=parent_object,
+                                                       object=object_name, size=row[1])
+            if components:
+                _set_size_components(db_object, row)
+            db_objects.append(db_object)
     return db_objects
 
 
-def load_1c_database_struct(file_path: str) -> dict:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        db_struct: dict = json.load(file)
+def iter_psql_objects_with_size(host: str, database: str, user: str, password: str,
+                                server_side_parsing: bool = False, aggregate: bool = False,
+                                itersize: int = 2000, estimate: bool = False, components: bool = False):
+    """
+    Rows are read with named server-side cursor, client keeps at most itersize rows in memory.
+    For server_side_parsing, aggregate, estimate and components see get_psql_objects_with_size.
+
+    :param itersize: rows fetched per round trip (optional, default to 2000)
+    :return: generator of DataBaseObject, connection is open until generator is exhausted or closed
+    """
+    server_side_parsing: bool = server_side_parsing or aggregate
+    with closing(psycopg2.connect(host=host, dbname=database, user=user, password=password)) as conn:
+        with conn.cursor(name='db_size_analysis_1c_psql') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(get_psql_objects_request(server_side_parsing, aggregate, estimate, components))
+            for row in cursor:
+                yield create_db_object(row, server_side_parsing, components)
+
+
+def create_db_object(row: tuple, server_side_parsing: bool = False, components: bool = False) -> DataBaseObject:
+    """
+    :param row: (relation, total_size) or server side parsed (namespace, parent_object, object, total_size),
+                with components (heap_size, toast_size, indexes_size, bloat_size) at the end
+    """
+    if server_side_parsing:
+        row: tuple[str, str, str, int]
+        db_object: DataBaseObject = DataBaseObject(namespace=row[0], parent_object=row[1], object=row[2],
+                                                   size=row[3])
+    else:
+        row: tuple[str, int]
+        namespace, parent_object, object_name = parse_relation(row[0])
+        db_object: DataBaseObject = DataBaseObject(namespace=namespace, parent_object=parent_object,
+                                                   object=object_name, size=row[1])
+    if components:
+        _set_size_components(db_object, row)
+    return db_object
+
+
+def _set_size_components(db_object: DataBaseObject, row: tuple):
+    """
+    :param row: query row with (heap_size, toast_size, indexes_size, bloat_size) at the end
+    """
+    db_object.heap_size, db_object.toast_size, db_object.indexes_size, db_object.bloat_size = row[-4:]
+
+
+def get_psql_objects_request(server_side_parsing: bool = False, aggregate: bool = False,
+                             estimate: bool = False, components: bool = False, oids: bool = False) -> str:
+    """
+    Relation name "_reference123_vt456" is split into prefix "", parent object "_reference123"
+    and child "_vt456", object is parent object (prefix if there is no parent object) + child.
+    Estimated size is (table + TOAST + their indexes) relpages * block_size, taken from catalog in one scan.
+    Size components are heap (with free space and visibility maps), TOAST (with its index), indexes
+    and bloat estimate - heap share of dead tuples from statistics collector.
+
+    :param oids: measure only relations with oids passed as query parameter (optional, default to False)
+    :return: query returning (relation, total_size) or (namespace, parent_object, object, total_size),
+             with components (heap_size, toast_size, indexes_size, bloat_size) added at the end
+    """
+    relations: str = "FROM pg_class C " \
+                     "LEFT JOIN pg_namespace N ON (N.oid = C.relnamespace) "
+    if estimate:
+        index_pages: str = "(SELECT X.indrelid, sum(I.relpages)::bigint AS \"relpages\" " \
+                           "FROM pg_index X " \
+                           "JOIN pg_class I ON (I.oid = X.indexrelid) " \
+                           "GROUP BY X.indrelid)"
+        relations += "LEFT JOIN pg_class T ON (T.oid = C.reltoastrelid) " \
+                     f"LEFT JOIN {index_pages} CI ON (CI.indrelid = C.oid) " \
+                     f"LEFT JOIN {index_pages} TI ON (TI.indrelid = C.reltoastrelid) " \
+                     "CROSS JOIN LATERAL (SELECT " \
+                     "(C.relpages::bigint + coalesce(T.relpages, 0) + coalesce(TI.relpages, 0)) " \
+                     "* current_setting('block_size')::bigint AS \"table_size\", " \
+                     "(coalesce(T.relpages, 0) + coalesce(TI.relpages, 0)) " \
+                     "* current_setting('block_size')::bigint AS \"toast_size\", " \
+                     "coalesce(CI.relpages, 0) * current_setting('block_size')::bigint AS \"indexes_size\") Z "
+    elif components:
+        relations += "CROSS JOIN LATERAL (SELECT " \
+                     "pg_table_size(C.oid) AS \"table_size\", " \
+                     "coalesce(pg_total_relation_size(nullif(C.reltoastrelid, 0)), 0) AS \"toast_size\", " \
+                     "pg_indexes_size(C.oid) AS \"indexes_size\") Z "
+    if components:
+        relations += "LEFT JOIN pg_stat_all_tables S ON (S.relid = C.oid) "
+    relations += "WHERE nspname NOT IN ('pg_catalog', 'information_schema') " \
+                 "AND C.relkind <> 'i' " \
+                 "AND nspname !~ '^pg_toast' "
+    if oids:
+        relations += "AND C.oid = ANY(%s) "
+    sizes: dict = dict()
+    if estimate or components:
+        sizes['total_size'] = "Z.table_size + Z.indexes_size"
+    else:
+        sizes['total_size'] = "pg_total_relation_size(C.oid)"
+    if components:
+        sizes['heap_size'] = "Z.table_size - Z.toast_size"
+        sizes['toast_size'] = "Z.toast_size"
+        sizes['indexes_size'] = "Z.indexes_size"
+        sizes['bloat_size'] = "coalesce((Z.table_size - Z.toast_size) * S.n_dead_tup " \
+                              "/ nullif(S.n_live_tup + S.n_dead_tup, 0), 0)::bigint"
+    size_columns: str = ', '.join(f'{size} AS "{name}"' for name, size in sizes.items())
+    if not (server_side_parsing or aggregate):
+        return "SELECT nspname || '.' || C.relname AS \"relation\", " \
+               f"{size_columns} " \
+               + relations + \
+               "ORDER BY nspname || '.' || C.relname;"
+    parsed_relations: str = "SELECT nspname AS \"namespace\", " \
+                            "C.relname, " \
+                            "substring(C.relname from '^[^_]*') AS \"prefix\", " \
+                            "substring(C.relname from '^[^_]*(_[^_]*)') AS \"parent_object\", " \
+                            "substring(C.relname from '^[^_]*_[^_]*(_[^_]*)') AS \"child\", " \
+                            f"{size_columns} " \
+                            + relations
+    db_object: str = "namespace, " \
+                     "parent_object, " \
+                     "coalesce(parent_object, prefix) || coalesce(child, '') AS \"object\""
+    if aggregate:
+        return f"SELECT {db_object}, " \
+               + ', '.join(f'sum({name})::bigint AS "{name}"' for name in sizes) + " " \
+               f"FROM ({parsed_relations}) R " \
+               "GROUP BY 1, 2, 3 " \
+               "ORDER BY 1, 3;"
+    return f"SELECT {db_object}, {', '.join(sizes)} " \
+           f"FROM ({parsed_relations}) R " \
+           "ORDER BY namespace, relname;"
+
+
+def load_1c_database_struct(file_path: str, keys: set = None, payloads: str = 'load',
+                            cache: bool = False) -> dict or Struct1CCache:
+    """
+    :param keys: keep only these structure elements, file is parsed incrementally (optional, all by default)
+    :param payloads: "load", "skip" or "lazy" - how "fields" and "index" of elements are loaded,
+                     lazy payloads are parsed from file on first access (optional, default to "load")
+    :param cache: query memory-mapped binary cache next to the file, built or rebuilt when file changes,
+                  keys are not needed (optional, default to False)
+    """
+    if payloads not in ('load', 'skip', 'lazy'):
+        raise AttributeError('Unsupported payloads mode')
+    if cache:
+        return Struct1CCache(file_path, payloads)
+    if keys is None and payloads == 'load':
+        with open(file_path, 'r', encoding='utf-8') as file:
+            db_struct: dict = json.load(file)
+        return db_struct
+    db_struct: dict = dict()
+    for key, element, offset, length in iter_1c_database_struct(file_path):
+        if keys is not None and key not in keys:
+            continue
+        if payloads != 'load':
+            for name in PAYLOAD_NAMES:
+                payload: dict = element.pop(name, None)
+                if payloads == 'lazy' and payload is not None and len(payload) > 0:
+                    element[name] = LazyStructPayload(file_path, offset, length, name)
+        db_struct[key] = element
     return db_struct
 
 
-def compile_db_objects_with_1c_struct(db_objects: SafeList, struct_1c: dict, create_tree: bool = False) -> \
-        SafeList or DataBaseObject:
-    data: DataBaseObject = DataBaseObject('DataBase')
+def compile_db_objects_with_1c_struct(db_objects: SafeList, struct_1c: dict, create_tree: bool = False,
+                                      name: str = 'DataBase') -> SafeList or DataBaseObject:
+    """
+    :param db_objects: list or iterator of DataBaseObject, iterator is consumed once, with create_tree objects
+                       become tree nodes and must not be compiled again
+    :param name: name of tree root (optional, default to "DataBase")
+    """
+    if not create_tree and not isinstance(db_objects, list):
+        db_objects: SafeList = SafeList(db_objects)
+    builder: DataBaseTreeBuilder = DataBaseTreeBuilder(name)
     for db_object in db_objects:
         db_object.set_attributes(**struct_1c.get(db_object.object, dict()))
         if create_tree:
-            if hasattr(db_object, 'table_name_1c') and db_object.table_name_1c != '':
-                keys: SafeList = SafeList(db_object.table_name_1c.split('.'))
-            elif hasattr(db_object, 'metadata') and db_object.metadata != '':
-                keys: SafeList = SafeList(db_object.metadata.split('.'))
-                if hasattr(db_object, 'purpose') and db_object.purpose != '':
-                    keys.append(db_object.purpose)
-            else:
-                keys: SafeList = SafeList()
-                keys.append('Service')
-                keys.append(db_object.object)
-            data.add_data_level(keys, db_object)
+            builder.add(get_tree_keys(db_object), db_object)
     if create_tree:
-        return data
+        return builder.build()
     else:
         return db_objects
 
 
-def create_db_size_analysis(host: str, database: str, user: str, password: str, struct_1c_file_path: str):
-    db_objects: SafeList = get_psql_objects_with_size(host, database, user, password)
-    struct_1c: dict = load_1c_database_struct(struct_1c_file_path)
-    return compile_db_objects_with_1c_struct(db_objects, struct_1c, True)
+def create_db_size_analysis(host: str, database: str, user: str, password: str, struct_1c_file_path: str,
+                            server_side_parsing: bool = False, aggregate: bool = False, itersize: int = None,
+                            struct_1c_payloads: str = 'load', struct_1c_cache: bool = False,
+                            estimate: bool = False, components: bool = False,
+                            instrumentation: Instrumentation = None):
+    """
+    :param estimate: approximate sizes from catalog statistics, tree root is flagged with "estimated"
+                     attribute, see get_psql_objects_with_size (optional, default to False)
+    :param components: collect heap, TOAST, indexes and bloat estimate sizes, see get_psql_objects_with_size
+                       (optional, default to False)
+    :param itersize: stream rows with server-side cursor fetching itersize rows per round trip (optional)
+    :param struct_1c_payloads: "load", "skip" or "lazy", see load_1c_database_struct. Unless "load",
+                               structure file is parsed incrementally keeping only collected objects
+                               (optional, default to "load")
+    :param struct_1c_cache: use binary cache of structure file, see load_1c_database_struct
+                            (optional, default to False)
+    :param instrumentation: measure stages "query", "load_struct" and "build_tree", with itersize query
+                            is measured as part of "build_tree" (optional)
+    """
+    if itersize is None:
+        with measure_stage(instrumentation, 'query') as metrics:
+            db_objects: SafeList = get_psql_objects_with_size(host, database, user, password,
+                                                              server_side_parsing, aggregate, estimate, components)
+            metrics.rows = len(db_objects)
+    else:
+        db_objects = iter_psql_objects_with_size(host, database, user, password,
+                                                 server_side_parsing, aggregate, itersize, estimate, components)
+    with measure_stage(instrumentation, 'load_struct') as metrics:
+        if struct_1c_cache:
+            struct_1c: Struct1CCache = load_1c_database_struct(struct_1c_file_path, payloads=struct_1c_payloads,
+                                                               cache=True)
+        elif struct_1c_payloads == 'load':
+            struct_1c: dict = load_1c_database_struct(struct_1c_file_path)
+        elif itersize is None:
+            struct_1c: dict = load_1c_database_struct(struct_1c_file_path,
+                                                      {db_object.object for db_object in db_objects},
+                                                      struct_1c_payloads)
+        else:
+            struct_1c: dict = load_1c_database_struct(struct_1c_file_path, payloads=struct_1c_payloads)
+        metrics.rows = len(struct_1c)
+    with measure_stage(instrumentation, 'build_tree') as metrics:
+        if itersize is not None:
+            db_objects = _count_rows(db_objects, metrics)
+        data: DataBaseObject = compile_db_objects_with_1c_struct(db_objects, struct_1c, True)
+        if itersize is None:
+            metrics.rows = len(db_objects)
+    if estimate:
+        data.set_attributes(estimated=True)
+    return data
+
+
+def _count_rows(db_objects, metrics: StageMetrics):
+    metrics.rows = 0
+    for db_object in db_objects:
+        metrics.rows += 1
+        yield db_object
+
+
+def create_multiple_db_size_analysis(host: str, databases: list, user: str, password: str,
+                                     struct_1c_file_paths: str or dict, max_workers: int = 4,
+                                     server_side_parsing: bool = False, aggregate: bool = False,
+                                     struct_1c_cache: bool = False, estimate: bool = False,
+                                     components: bool = False, struct_1c_payloads: str = 'lazy') -> DataBaseObject:
+    """
+    Sizes are collected concurrently, one connection per database, at most max_workers at once.
+    Structure files are loaded while queries are running. If any analysis fails, queued databases
+    are not scanned and the error is raised without waiting for running scans.
+
+    :param databases: database names
+    :param struct_1c_file_paths: structure file path for all databases or dict{database: structure file path}
+    :param max_workers: maximum number of concurrent connections (optional, default to 4)
+    :param struct_1c_cache: use binary cache of structure files, see load_1c_database_struct
+                            (optional, default to False)
+    :param estimate: approximate sizes from catalog statistics, tree root is flagged with "estimated"
+                     attribute, see get_psql_objects_with_size (optional, default to False)
+    :param components: collect heap, TOAST, indexes and bloat estimate sizes, see get_psql_objects_with_size
+                       (optional, default to False)
+    :param struct_1c_payloads: "load", "skip" or "lazy", see load_1c_database_struct (optional, default to "lazy")
+    :return: tree with one child per database
+    """
+    if type(struct_1c_file_paths) == str:
+        struct_1c_file_paths: dict = {database: struct_1c_file_paths for database in databases}
+    data: DataBaseObject = DataBaseObject('DataBases')
+    executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures: dict = {executor.submit(get_psql_objects_with_size, host, database, user, password,
+                                         server_side_parsing, aggregate, estimate, components): database
+                         for database in databases}
+        structs_1c: dict = dict()
+        for file_path in struct_1c_file_paths.values():
+            if file_path not in structs_1c:
+                structs_1c[file_path] = load_1c_database_struct(file_path, payloads=struct_1c_payloads,
+                                                                cache=struct_1c_cache)
+        for future in as_completed(futures):
+            database: str = futures[future]
+            data[database] = compile_db_objects_with_1c_struct(future.result(),
+                                                               structs_1c[struct_1c_file_paths[database]],
+                                                               True,
+                                                               database)
+            data.add_size(data[database])
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    data.children = {database: data[database] for database in databases}
+    if estimate:
+        data.set_attributes(estimated=True)
+    return data
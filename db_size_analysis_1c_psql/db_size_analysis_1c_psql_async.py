@@ -0,0 +1,139 @@
+import asyncio
+
+import psycopg2
+
+from .data_base_object import DataBaseObject
+from .data_base_tree_builder import DataBaseTreeBuilder, get_tree_keys
+from .db_size_analysis_1c_psql import create_db_object, get_psql_objects_request, load_1c_database_struct
+
+
+async def create_db_size_analysis_async(host: str, database: str, user: str, password: str,
+                                        struct_1c_file_path: str, timeout: float = None, itersize: int = 2000,
+                                        server_side_parsing: bool = False, aggregate: bool = False,
+                                        estimate: bool = False, components: bool = False,
+                                        struct_1c_payloads: str = 'load', struct_1c_cache: bool = False,
+                                        name: str = 'DataBase') -> DataBaseObject:
+    """
+    Blocking psycopg2 calls run in worker threads, rows are fetched in batches of itersize through named
+    server-side cursor and added to the tree between fetches, so event loop is never blocked for a whole scan.
+    Structure file is loaded while query is running.
+    On cancellation or timeout running query is cancelled on server and connection is closed.
+    For other parameters see create_db_size_analysis.
+
+    :param timeout: seconds to wait for analysis, asyncio.TimeoutError is raised after (optional, not limited)
+    :param name: name of tree root (optional, default to "DataBase")
+    """
+    struct_1c: asyncio.Task = asyncio.ensure_future(asyncio.to_thread(load_1c_database_struct, struct_1c_file_path,
+                                                                      payloads=struct_1c_payloads,
+                                                                      cache=struct_1c_cache))
+    try:
+        return await asyncio.wait_for(_create_db_size_analysis(host, database, user, password, struct_1c, itersize,
+                                                               server_side_parsing, aggregate, estimate, components,
+                                                               name),
+                                      timeout)
+    finally:
+        struct_1c.cancel()
+
+
+async def create_multiple_db_size_analysis_async(host: str, databases: list, user: str, password: str,
+                                                 struct_1c_file_paths: str or dict, timeout: float = None,
+                                                 max_concurrency: int = 4, itersize: int = 2000,
+                                                 server_side_parsing: bool = False, aggregate: bool = False,
+                                                 estimate: bool = False, components: bool = False,
+                                                 struct_1c_payloads: str = 'lazy',
+                                                 struct_1c_cache: bool = False) -> DataBaseObject:
+    """
+    Every distinct structure file is loaded once. If analysis of any database fails, analyses of other
+    databases are cancelled and the error is raised.
+    For other parameters see create_db_size_analysis_async.
+
+    :param databases: database names
+    :param struct_1c_file_paths: structure file path for all databases or dict{database: structure file path}
+    :param timeout: seconds to wait for every database analysis (optional, not limited)
+    :param max_concurrency: maximum number of databases scanned at once (optional, default to 4)
+    :param struct_1c_payloads: "load", "skip" or "lazy", see load_1c_database_struct (optional, default to "lazy")
+    :return: tree with one child per database
+    """
+    if type(struct_1c_file_paths) == str:
+        struct_1c_file_paths: dict = {database: struct_1c_file_paths for database in databases}
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrency)
+    structs_1c: dict = dict()
+    for file_path in struct_1c_file_paths.values():
+        if file_path not in structs_1c:
+            structs_1c[file_path] = asyncio.ensure_future(asyncio.to_thread(load_1c_database_struct, file_path,
+                                                                            payloads=struct_1c_payloads,
+                                                                            cache=struct_1c_cache))
+
+    async def analyse(database: str) -> DataBaseObject:
+        async with semaphore:
+            return await asyncio.wait_for(_create_db_size_analysis(host, database, user, password,
+                                                                   structs_1c[struct_1c_file_paths[database]],
+                                                                   itersize, server_side_parsing, aggregate,
+                                                                   estimate, components, database),
+                                          timeout)
+
+    tasks: list = [asyncio.ensure_future(analyse(database)) for database in databases]
+    try:
+        analyses: list = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        for struct_1c in structs_1c.values():
+            struct_1c.cancel()
+    data: DataBaseObject = DataBaseObject('DataBases')
+    for database, analysis in zip(databases, analyses):
+        data[database] = analysis
+        data.add_size(analysis)
+    if estimate:
+        data.set_attributes(estimated=True)
+    return data
+
+
+async def _create_db_size_analysis(host: str, database: str, user: str, password: str, struct_1c: asyncio.Future,
+                                   itersize: int, server_side_parsing: bool, aggregate: bool, estimate: bool,
+                                   components: bool, name: str) -> DataBaseObject:
+    """
+    :param struct_1c: future of loaded structure, awaited after query is started
+    """
+    server_side_parsing: bool = server_side_parsing or aggregate
+    builder: DataBaseTreeBuilder = DataBaseTreeBuilder(name)
+    connecting: asyncio.Future = asyncio.ensure_future(asyncio.to_thread(psycopg2.connect, host=host, dbname=database,
+                                                                         user=user, password=password))
+    try:
+        conn = await asyncio.shield(connecting)
+    except asyncio.CancelledError:
+        connecting.add_done_callback(_close_connection)
+        raise
+    try:
+        cursor = conn.cursor(name='db_size_analysis_1c_psql')
+        await asyncio.to_thread(cursor.execute,
+                                get_psql_objects_request(server_side_parsing, aggregate, estimate, components))
+        struct_1c: dict = await asyncio.shield(struct_1c)
+        while True:
+            rows: list = await asyncio.to_thread(cursor.fetchmany, itersize)
+            if len(rows) == 0:
+                break
+            for row in rows:
+                db_object: DataBaseObject = create_db_object(row, server_side_parsing, components)
+                db_object.set_attributes(**struct_1c.get(db_object.object, dict()))
+                builder.add(get_tree_keys(db_object), db_object)
+    except asyncio.CancelledError:
+        await asyncio.to_thread(conn.cancel)
+        raise
+    finally:
+        await asyncio.to_thread(conn.close)
+    data: DataBaseObject = builder.build()
+    if estimate:
+        data.set_attributes(estimated=True)
+    return data
+
+
+def _close_connection(connecting: asyncio.Future):
+    """
+    Close connection opened after its analysis was cancelled.
+    """
+    if not connecting.cancelled() and connecting.exception() is None:
+        asyncio.get_running_loop().run_in_executor(None, connecting.result().close)
@@ -4,13 +4,17 @@ import openpyxl.styles as styles
 from openpyxl.cell import Cell as BaseCell
 from openpyxl.worksheet.worksheet import Worksheet
 
+from .column_widths import update_column_width
+
 
 class Cell(BaseCell):
-    def __init__(self, sheet: Worksheet, row: int, column: int, data: str or dict):
+    def __init__(self, sheet: Worksheet, row: int, column: int, data: str or dict, column_widths: list = None):
         """
         :param data: value string or excel processor format dict
+        :param column_widths: running maximum text lengths of columns, updated on set (optional)
         """
         self.parent_cell: BaseCell = sheet.cell(row, column)
+        self.__column_widths: list = column_widths
         super(Cell, self).__init__(self.parent_cell.parent,
                                    self.parent_cell.row,
                                    self.parent_cell.column,
@@ -38,6 +42,8 @@ class Cell(BaseCell):
                 self.set_borders(**data.get('border'))
             if data.get('wrap_text'):
                 self.set_wrap_text()
+        if self.__column_widths is not None:
+            update_column_width(self.__column_widths, self.parent_cell.column - 1, self.parent_cell.value)
 
     def font_style(self, **kwargs):
         """
@@ -0,0 +1,13 @@
+def update_column_width(column_widths: list, index: int, value):
+    """
+    :param column_widths: running maximum text lengths of columns, index is column index - 1
+    :param index: column index - 1
+    :param value: cell value
+    """
+    width: int = len(str(value))
+    if len(column_widths) > index:
+        if width > column_widths[index]:
+            column_widths[index] = width
+    else:
+        column_widths.extend([0] * (index - len(column_widths)))
+        column_widths.append(width)
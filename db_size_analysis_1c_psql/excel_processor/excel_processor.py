@@ -1,26 +1,89 @@
 import openpyxl
+import openpyxl.styles as styles
 import openpyxl.utils
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.worksheet.dimensions import RowDimension
 from openpyxl.worksheet.properties import PageSetupProperties
 from openpyxl.worksheet.worksheet import Worksheet
 
+from .column_widths import update_column_width
 from .row import Row
 
 
 class ExcelProcessor:
-    def __init__(self, file_path: str = None):
+    def __init__(self, file_path: str = None, write_only: bool = False):
+        """
+        :param file_path: workbook to be loaded (optional)
+        :param write_only: create streaming workbook, rows are written immediately with append_row
+                           and can not be changed later (optional, default to False)
+        """
         if file_path is None:
-            self.__workbook: openpyxl.Workbook = openpyxl.Workbook()
+            self.__workbook: openpyxl.Workbook = openpyxl.Workbook(write_only=write_only)
+        elif write_only:
+            raise TypeError('file_path and write_only can not be used together')
         else:
             self.__workbook: openpyxl.Workbook = openpyxl.load_workbook(file_path)
-        self.__sheet: Worksheet = self.__workbook.active
+        if write_only:
+            self.__sheet: Worksheet = self.__workbook.create_sheet()
+        else:
+            self.__sheet: Worksheet = self.__workbook.active
+        self.__write_only: bool = write_only
         self.__current_row_index: int = 1
+        self.__column_widths: list = []
+        if file_path is not None:
+            for row in self.__sheet.iter_rows(values_only=True):
+                self.measure_row(*row)
 
     def add_row(self, *args) -> Row:
-        row: Row = Row(self.__sheet, self.__current_row_index)
+        row: Row = Row(self.__sheet, self.__current_row_index, self.__column_widths)
         row.set(*args)
         self.__current_row_index += 1
         return row
 
+    def append_row(self, *args, style: str = None, outline_level: int = 0, hidden: bool = False) -> int:
+        """
+        Write-only mode. Row is written immediately and can not be changed later.
+        Column widths are not updated, use measure_row before first row is appended.
+
+        :param args: cell values
+        :param style: named style of row cells (optional)
+        :param outline_level: outline level of row (optional, default to 0)
+        :param hidden: should the row be hidden on workbook open or not (optional, default to False)
+        :return: row index
+        """
+        index: int = self.__current_row_index
+        if outline_level > 0 or hidden:
+            self.__sheet.row_dimensions[index] = RowDimension(self.__sheet,
+                                                              index=index,
+                                                              outlineLevel=outline_level,
+                                                              hidden=hidden)
+        cells: list = []
+        for value in args:
+            cell: WriteOnlyCell = WriteOnlyCell(self.__sheet, value)
+            if style is not None:
+                cell.style = style
+            cells.append(cell)
+        self.__sheet.append(cells)
+        if self.__write_only:
+            self.__sheet.row_dimensions.pop(index, None)
+        else:
+            self.measure_row(*args)
+        self.__current_row_index += 1
+        return index
+
+    def add_named_style(self, name: str, wrap_text: bool = False, **kwargs):
+        """
+        Named style is shared by all cells it is applied to.
+
+        :param name: style name
+        :param wrap_text: wrap text of cells (optional, default to False)
+        :Keyword Arguments: font arguments, see Cell.font_style
+        """
+        style: styles.NamedStyle = styles.NamedStyle(name=name, font=styles.Font(**kwargs))
+        if wrap_text:
+            style.alignment = styles.Alignment(wrap_text=True)
+        self.__workbook.add_named_style(style)
+
     def create_rows_tree(self, start: int,
                          end: int,
                          children_index: list = None,
@@ -33,19 +96,19 @@ class ExcelProcessor:
         :param outline_level: outline level (optional, default to 1)
         :param hidden: should the group be hidden on workbook open or not (optional, default to True)
         """
-        self.group_rows(start, end, outline_level, hidden)
-        if children_index is not None:
-            for child_index in children_index:
-                try:
-                    range_size: int = child_index['end'] - child_index['start']
-                except IndexError:
-                    raise IndexError('keys "start" and "end" must be defined in "children_index"')
-                if range_size > 0:
-                    self.create_rows_tree(child_index['start'],
-                                          child_index['end'],
-                                          child_index.get('children_index'),
-                                          outline_level + 1,
-                                          hidden)
+        self.set_rows_outline_levels(self.__get_outline_levels(start, end, children_index, outline_level), hidden)
+
+    def set_rows_outline_levels(self, outline_levels: dict, hidden: bool = True):
+        """
+        Every row dimension is written once.
+
+        :param outline_levels: dict{row index: outline level}
+        :param hidden: should grouped rows be hidden on workbook open or not (optional, default to True)
+        """
+        for index, outline_level in outline_levels.items():
+            row_dimension: RowDimension = self.__sheet.row_dimensions[index]
+            row_dimension.outline_level = outline_level
+            row_dimension.hidden = hidden
 
     def group_rows(self, start: int, end: int = None, outline_level: int = 1, hidden: bool = True):
         """
@@ -58,8 +121,8 @@ class ExcelProcessor:
         """
         self.__sheet.row_dimensions.group(start, end, outline_level, hidden)
 
-    def create_columns_tree(self, start: int,
-                            end: int,
+    def create_columns_tree(self, start: int or str,
+                            end: int or str,
                             children_index: list = None,
                             outline_level: int = 1,
                             hidden: bool = True):
@@ -70,21 +133,22 @@ class ExcelProcessor:
         :param outline_level: outline level (optional, default to 1)
         :param hidden: should the group be hidden on workbook open or not (optional, default to True)
         """
-        self.group_columns(start, end, outline_level, hidden)
-        if children_index is not None:
-            for child_index in children_index:
-                try:
-                    range_size: int = child_index['end'] - child_index['start']
-                except IndexError:
-                    raise IndexError('keys "start" and "end" must be defined in "children_index"')
-                if range_size > 0:
-                    self.create_columns_tree(child_index['start'],
-                                             child_index['end'],
-                                             child_index.get('children_index'),
-                                             outline_level + 1,
-                                             hidden)
-
-    def group_columns(self, start: int, end: int = None, outline_level: int = 1, hidden: bool = True):
+        if type(start) == str:
+            start: int = openpyxl.utils.column_index_from_string(start)
+        if type(end) == str:
+            end: int = openpyxl.utils.column_index_from_string(end)
+        outline_levels: dict = self.__get_outline_levels(start, end, children_index, outline_level)
+        group_start: int = start
+        for index in range(start, end + 2):
+            if outline_levels.get(index) != outline_levels.get(group_start):
+                if outline_levels.get(group_start) is not None:
+                    self.group_columns(openpyxl.utils.get_column_letter(group_start),
+                                       openpyxl.utils.get_column_letter(index - 1),
+                                       outline_levels[group_start],
+                                       hidden)
+                group_start = index
+
+    def group_columns(self, start: str, end: str = None, outline_level: int = 1, hidden: bool = True):
         """
         For tree: use outline_level 1 to X in order. Outline_level overwritten for range.
 
@@ -95,15 +159,64 @@ class ExcelProcessor:
         """
         self.__sheet.column_dimensions.group(start, end, outline_level, hidden)
 
+    @staticmethod
+    def __get_outline_levels(start: int, end: int, children_index: list = None, outline_level: int = 1) -> dict:
+        """
+        Nested groups are collected without recursion, then every index gets the level of the innermost group
+        in a single sweep.
+
+        :return: dict{index: outline level}
+        """
+        groups: list = [(start, end, outline_level)]
+        stack: list = [(children_index, outline_level + 1)]
+        while len(stack) > 0:
+            children_index, outline_level = stack.pop()
+            if children_index is None:
+                continue
+            for child_index in children_index:
+                try:
+                    range_size: int = child_index['end'] - child_index['start']
+                except KeyError:
+                    raise IndexError('keys "start" and "end" must be defined in "children_index"')
+                if range_size > 0:
+                    groups.append((child_index['start'], child_index['end'], outline_level))
+                    stack.append((child_index.get('children_index'), outline_level + 1))
+        groups.sort(key=lambda group: (group[0], group[2]))
+        outline_levels: dict = dict()
+        active_groups: list = []
+        group_index: int = 0
+        for index in range(groups[0][0], max(group[1] for group in groups) + 1):
+            while len(active_groups) > 0 and active_groups[-1][1] < index:
+                active_groups.pop()
+            while group_index < len(groups) and groups[group_index][0] == index:
+                active_groups.append(groups[group_index])
+                group_index += 1
+            if len(active_groups) > 0:
+                outline_levels[index] = active_groups[-1][2]
+        return outline_levels
+
+    def measure_row(self, *args):
+        """
+        Update column widths with row values without writing them.
+
+        :param args: cell values
+        """
+        for index, value in enumerate(args):
+            update_column_width(self.__column_widths, index, value)
+
     def set_optimal_column_widths(self):
-        column_widths: list = []
-        for row in self.__sheet.rows:
-            for index, cell in enumerate(row):
-                if len(column_widths) > index:
-                    if len(str(cell.value)) > column_widths[index]:
-                        column_widths[index] = len(str(cell.value))
-                else:
-                    column_widths.append(len(str(cell.value)))
+        """
+        Widths are tracked while rows are added, cells of loaded workbook are measured when it is loaded.
+        In write-only mode call before first row is appended.
+        """
+        self.set_column_widths(self.__column_widths)
+
+    def set_column_widths(self, column_widths: list):
+        """
+        In write-only mode column widths must be set before first row is appended.
+
+        :param column_widths: list of text lengths, index is column index - 1
+        """
         for index, column_width in enumerate(column_widths):
             self.__sheet.column_dimensions[openpyxl.utils.get_column_letter(index + 1)].width = column_width + 1
 
@@ -4,8 +4,12 @@ from .cell import Cell
 
 
 class Row:
-    def __init__(self, sheet: Worksheet, index: int):
+    def __init__(self, sheet: Worksheet, index: int, column_widths: list = None):
+        """
+        :param column_widths: running maximum text lengths of columns, updated by cells (optional)
+        """
         self.__sheet: Worksheet = sheet
+        self.__column_widths: list = column_widths
         self.index: int = index
         self.cells: tuple = ()
         self.__current_column_index: int = 1
@@ -25,7 +29,7 @@ class Row:
         """
         :param data: value string or excel processor format dict
         """
-        cell: Cell = Cell(self.__sheet, self.index, self.__current_column_index, data)
+        cell: Cell = Cell(self.__sheet, self.index, self.__current_column_index, data, self.__column_widths)
         self.__current_column_index += 1
         self.cells += (cell, )
         return cell
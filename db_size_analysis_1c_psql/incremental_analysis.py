@@ -0,0 +1,191 @@
+import os
+import pickle
+from contextlib import closing
+
+import psycopg2
+
+from .data_base_object import DataBaseObject
+from .data_base_tree_builder import get_tree_keys
+from .db_size_analysis_1c_psql import create_db_object, get_psql_objects_request, load_1c_database_struct
+from .struct_1c import get_file_digest
+
+_NO_SIZES: tuple = (0, 0, 0, 0, 0)
+
+
+class IncrementalAnalysis:
+    """
+    Analysis tree kept between runs. Catalog state of relations is compared with previous run, only changed
+    relations are measured and tree is patched in place, ancestors sizes are updated on the way.
+    Relation is changed if its oid, relfilenode (rewritten by TRUNCATE, VACUUM FULL, CLUSTER), relpages,
+    relfilenode or relpages of its TOAST table, write or vacuum counters from pg_stat_user_tables differ.
+    New objects are added to the end of their parents, sort tree again if order matters.
+    Size, modification time and hash of structure file are kept with state, if structure file is changed
+    tree is built again from all relations.
+    """
+
+    def __init__(self, host: str, database: str, user: str, password: str, struct_1c_file_path: str,
+                 state_file_path: str = None, components: bool = False, struct_1c_cache: bool = False,
+                 name: str = 'DataBase'):
+        """
+        :param state_file_path: tree and relations state are loaded from this file if it exists
+                                and saved to it after every update (optional, kept in memory only by default)
+        :param components: collect heap, TOAST, indexes and bloat estimate sizes (optional, default to False)
+        :param struct_1c_cache: use binary cache of structure file, see load_1c_database_struct
+                                (optional, default to False)
+        :param name: name of tree root (optional, default to "DataBase")
+        """
+        self.host: str = host
+        self.database: str = database
+        self.user: str = user
+        self.password: str = password
+        self.struct_1c_file_path: str = struct_1c_file_path
+        self.state_file_path: str = state_file_path
+        self.components: bool = components
+        self.struct_1c_cache: bool = struct_1c_cache
+        self.data: DataBaseObject = DataBaseObject(name)
+        self.__states: dict = dict()
+        self.__relations: dict = dict()
+        self.__keys_relations: dict = dict()
+        self.__struct_1c_state: tuple = None
+        if state_file_path is not None and os.path.exists(state_file_path):
+            with open(state_file_path, 'rb') as file:
+                self.data, self.__states, self.__relations, self.__keys_relations, self.__struct_1c_state = \
+                    pickle.load(file)
+
+    def update(self) -> int:
+        """
+        :return: number of measured relations
+        """
+        if not self.__check_struct_1c():
+            self.data = DataBaseObject(self.data.key)
+            self.__states = dict()
+            self.__relations = dict()
+            self.__keys_relations = dict()
+        with closing(psycopg2.connect(host=self.host, dbname=self.database, user=self.user,
+                                      password=self.password)) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(get_psql_relations_state_request())
+                states: dict = {row[0]: row[1:] for row in cursor}
+                changed: list = [state[0] for relation, state in states.items()
+                                 if self.__states.get(relation) != state]
+                rows: list = []
+                if len(self.__states) == 0:
+                    cursor.execute(get_psql_objects_request(components=self.components))
+                    rows = cursor.fetchall()
+                elif len(changed) > 0:
+                    cursor.execute(get_psql_objects_request(components=self.components, oids=True), (changed,))
+                    rows = cursor.fetchall()
+        db_objects: dict = {row[0]: create_db_object(row, False, self.components) for row in rows}
+        new_objects: set = {db_object.object for relation, db_object in db_objects.items()
+                            if relation not in self.__relations}
+        struct_1c: dict = dict()
+        if len(new_objects) > 0:
+            struct_1c = load_1c_database_struct(self.struct_1c_file_path, None if self.struct_1c_cache else new_objects,
+                                                cache=self.struct_1c_cache)
+        for relation, db_object in db_objects.items():
+            sizes: tuple = (db_object.size, db_object.heap_size, db_object.toast_size, db_object.indexes_size,
+                            db_object.bloat_size)
+            if relation in self.__relations:
+                keys, old_sizes = self.__relations[relation]
+                self.__patch(keys, old_sizes, sizes)
+            else:
+                db_object.set_attributes(**struct_1c.get(db_object.object, dict()))
+                keys: tuple = get_tree_keys(db_object)
+                self.__keys_relations[keys] = self.__keys_relations.get(keys, 0) + 1
+                self.__patch(keys, _NO_SIZES, sizes, db_object)
+            self.__relations[relation] = (keys, sizes)
+        for relation in [relation for relation in self.__relations if relation not in states]:
+            keys, old_sizes = self.__relations.pop(relation)
+            self.__patch(keys, old_sizes, _NO_SIZES)
+            self.__keys_relations[keys] -= 1
+            if self.__keys_relations[keys] == 0:
+                del self.__keys_relations[keys]
+                self.__remove(keys)
+        self.__states = {relation: state for relation, state in states.items() if relation in self.__relations}
+        if self.state_file_path is not None:
+            temp_path: str = f'{self.state_file_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as file:
+                pickle.dump((self.data, self.__states, self.__relations, self.__keys_relations,
+                             self.__struct_1c_state), file)
+            os.replace(temp_path, self.state_file_path)
+        return len(db_objects)
+
+    def __check_struct_1c(self) -> bool:
+        """
+        File is hashed only if its size or modification time differs from saved state.
+
+        :return: True if structure file is not changed since previous update, saved state is updated
+        """
+        stat: os.stat_result = os.stat(self.struct_1c_file_path)
+        if self.__struct_1c_state is not None:
+            size, mtime_ns, digest = self.__struct_1c_state
+            if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+                return True
+            if size == stat.st_size and digest == get_file_digest(self.struct_1c_file_path):
+                self.__struct_1c_state = (size, stat.st_mtime_ns, digest)
+                return True
+        self.__struct_1c_state = (stat.st_size, stat.st_mtime_ns, get_file_digest(self.struct_1c_file_path))
+        return False
+
+    def __patch(self, keys: tuple, old_sizes: tuple, sizes: tuple, db_object: DataBaseObject = None):
+        """
+        :param db_object: new object, its attributes are set to tree object (optional)
+        """
+        delta: DataBaseObject = DataBaseObject()
+        delta.size, delta.heap_size, delta.toast_size, delta.indexes_size, delta.bloat_size = \
+            (size - old_size for size, old_size in zip(sizes, old_sizes))
+        data_base_object: DataBaseObject = self.data
+        data_base_object.add_size(delta)
+        for key in keys:
+            child: DataBaseObject = data_base_object.get(key)
+            if child is None:
+                child = DataBaseObject()
+                data_base_object[key] = child
+            child.add_size(delta)
+            data_base_object = child
+        if db_object is not None:
+            data_base_object.set_attributes(**db_object.get_attributes())
+
+    def __remove(self, keys: tuple):
+        """
+        Remove tree object and its ancestors left without children and relations,
+        object with children is replaced with plain group object.
+        """
+        data_base_object: DataBaseObject = self.data
+        for key in keys:
+            data_base_object = data_base_object[key]
+        if len(data_base_object.children) > 0:
+            group: DataBaseObject = DataBaseObject()
+            group.set_size(data_base_object)
+            group.children = dict(data_base_object.children)
+            data_base_object.parent[keys[-1]] = group
+            return
+        keys: list = list(keys)
+        while len(keys) > 0 and len(data_base_object.children) == 0 and tuple(keys) not in self.__keys_relations:
+            parent: DataBaseObject = data_base_object.parent
+            del parent[keys.pop()]
+            data_base_object = parent
+
+
+def get_psql_relations_state_request() -> str:
+    """
+    Catalog scan without measuring relation files.
+
+    :return: query returning (relation, oid, relfilenode, relpages, TOAST relfilenode, TOAST relpages,
+             writes, vacuums)
+    """
+    return "SELECT nspname || '.' || C.relname AS \"relation\", " \
+           "C.oid, " \
+           "C.relfilenode, " \
+           "C.relpages, " \
+           "coalesce(T.relfilenode, 0) AS \"toast_relfilenode\", " \
+           "coalesce(T.relpages, 0) AS \"toast_relpages\", " \
+           "coalesce(S.n_tup_ins + S.n_tup_upd + S.n_tup_del, 0) AS \"writes\", " \
+           "coalesce(S.vacuum_count + S.autovacuum_count, 0) AS \"vacuums\" " \
+           "FROM pg_class C " \
+           "LEFT JOIN pg_namespace N ON (N.oid = C.relnamespace) " \
+           "LEFT JOIN pg_class T ON (T.oid = C.reltoastrelid) " \
+           "LEFT JOIN pg_stat_user_tables S ON (S.relid = C.oid) " \
+           "WHERE nspname NOT IN ('pg_catalog', 'information_schema') " \
+           "AND C.relkind <> 'i' " \
+           "AND nspname !~ '^pg_toast';"
@@ -0,0 +1,109 @@
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import StringIO
+
+
+class StageMetrics:
+    """
+    Metrics of one analysis stage, rows is set by stage code when known.
+    """
+    __slots__ = ('name', 'seconds', 'rows', 'peak_memory', 'profile')
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.seconds: float = 0.0
+        self.rows: int = None
+        self.peak_memory: int = None
+        self.profile: pstats.Stats = None
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'seconds': self.seconds, 'rows': self.rows, 'peak_memory': self.peak_memory}
+
+    def __str__(self):
+        rows: str = '' if self.rows is None else f', {self.rows} rows'
+        memory: str = '' if self.peak_memory is None else f', peak {self.peak_memory / (1 << 20):.1f} MB'
+        return f'{self.name}: {self.seconds:.3f} s{rows}{memory}'
+
+
+class Instrumentation:
+    """
+    Collects wall time, processed rows, peak memory (tracemalloc) and cProfile statistics of analysis stages.
+    Pass it as instrumentation to create_db_size_analysis or export_to_excel, own code can be measured
+    with "with instrumentation.stage('sort'):".
+    """
+
+    def __init__(self, callback=None, memory: bool = False, profile: bool = False):
+        """
+        :param callback: called with StageMetrics after each stage, e.g. to send metrics (optional)
+        :param memory: trace peak memory of stages, slows stages down (optional, default to False)
+        :param profile: capture cProfile statistics of stages (optional, default to False)
+        """
+        self.callback = callback
+        self.memory: bool = memory
+        self.profile: bool = profile
+        self.stages: list = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        :return: context manager yielding StageMetrics of stage
+        """
+        metrics: StageMetrics = StageMetrics(name)
+        tracing: bool = False
+        if self.memory:
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        profiler: cProfile.Profile = cProfile.Profile() if self.profile else None
+        start: float = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield metrics
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            metrics.seconds = time.perf_counter() - start
+            if self.memory:
+                metrics.peak_memory = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+            if profiler is not None:
+                metrics.profile = pstats.Stats(profiler, stream=StringIO())
+            self.stages.append(metrics)
+            if self.callback is not None:
+                self.callback(metrics)
+
+    def summary(self, profile_limit: int = 0) -> str:
+        """
+        :param profile_limit: add this number of top functions by cumulative time of profiled stages
+                              (optional, default to 0)
+        """
+        lines: list = [str(metrics) for metrics in self.stages]
+        lines.append(f'total: {sum(metrics.seconds for metrics in self.stages):.3f} s')
+        if profile_limit > 0:
+            for metrics in self.stages:
+                if metrics.profile is None:
+                    continue
+                stream: StringIO = StringIO()
+                metrics.profile.stream = stream
+                metrics.profile.sort_stats('cumulative').print_stats(profile_limit)
+                lines.append(f'{metrics.name} profile:{stream.getvalue()}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def measure_stage(instrumentation: Instrumentation, name: str):
+    """
+    :return: context manager yielding StageMetrics, not measured if instrumentation is None
+    """
+    if instrumentation is None:
+        yield StageMetrics(name)
+    else:
+        with instrumentation.stage(name) as metrics:
+            yield metrics
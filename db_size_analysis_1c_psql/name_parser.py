@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+
+_RELATION: re.Pattern = re.compile(r'([^.]*)\.([^_]*)(_[^_]*)?(_[^_]*)?')
+
+
+@lru_cache(maxsize=4096)
+def parse_relation(relation: str) -> tuple:
+    """
+    Same rule as server side parsing: "public._document123_vt456" is split into namespace "public", prefix "",
+    parent object "_document123" and child "_vt456", object is parent object (prefix if there is no parent
+    object) + child. "_accumrg12", "_accumrgt12", "_inforg7", "_const3" are parent objects without child,
+    "config" is prefix only. Recently parsed relations are cached, cache is bounded, so it is kept small
+    on large databases.
+
+    :param relation: "namespace.table_name"
+    :return: (namespace, parent_object or None, object)
+    """
+    namespace, prefix, parent_object, child = _RELATION.match(relation).groups()
+    if parent_object is None:
+        return namespace, None, prefix
+    if child is None:
+        return namespace, parent_object, parent_object
+    return namespace, parent_object, parent_object + child
+
+
+def parse_relations(relations: list) -> tuple:
+    """
+    Batch version of parse_relation, names of one scan are unique, so cache is not used.
+
+    :param relations: "namespace.table_name" names
+    :return: parallel lists (namespaces, parent_objects, objects)
+    """
+    namespaces: list = []
+    parent_objects: list = []
+    objects: list = []
+    match = _RELATION.match
+    for relation in relations:
+        namespace, prefix, parent_object, child = match(relation).groups()
+        namespaces.append(namespace)
+        parent_objects.append(parent_object)
+        if parent_object is None:
+            objects.append(prefix)
+        elif child is None:
+            objects.append(parent_object)
+        else:
+            objects.append(parent_object + child)
+    return namespaces, parent_objects, objects
@@ -0,0 +1,121 @@
+import json
+import struct
+import zlib
+from datetime import datetime
+
+from .data_base_tree_builder import get_tree_keys
+from .safe_list import SafeList
+
+_RECORD_HEADER: struct.Struct = struct.Struct('<4sI')
+_RECORD_MAGIC: bytes = b'DBSS'
+
+
+class Snapshot:
+    """
+    Per-relation sizes of one analysis run stored by columns: object keys, tree paths and sizes.
+    """
+
+    def __init__(self, objects: list, paths: list, sizes: list, timestamp: datetime = None, database: str = None):
+        """
+        :param objects: object keys "namespace.object"
+        :param paths: tree paths of objects without root name
+        :param sizes: sizes of relations
+        :param timestamp: time of analysis (optional, default to now)
+        :param database: database name (optional)
+        """
+        self.objects: list = objects
+        self.paths: list = paths
+        self.sizes: list = sizes
+        self.timestamp: datetime = datetime.now() if timestamp is None else timestamp
+        self.database: str = database
+
+    @classmethod
+    def from_db_objects(cls, db_objects: list, timestamp: datetime = None, database: str = None):
+        """
+        Snapshot is taken from relations, not from tree, where relations with the same path are merged.
+        Sizes of relations with the same object key are summed.
+
+        :param db_objects: objects compiled with 1C structure before tree is built from them,
+                           see compile_db_objects_with_1c_struct
+        """
+        sizes: dict = dict()
+        paths: dict = dict()
+        for db_object in db_objects:
+            key: str = f'{db_object.get_attribute("namespace", "")}.{db_object.object}'
+            sizes[key] = sizes.get(key, 0) + db_object.size
+            paths[key] = '.'.join(get_tree_keys(db_object))
+        return cls(list(sizes), list(paths.values()), list(sizes.values()), timestamp, database)
+
+    def append_to(self, file_path: str):
+        """
+        Snapshot is appended to file as a separate compressed record, earlier records are not read.
+        """
+        data: bytes = zlib.compress(json.dumps({'timestamp': self.timestamp.isoformat(),
+                                                'database': self.database,
+                                                'objects': self.objects,
+                                                'paths': self.paths,
+                                                'sizes': self.sizes},
+                                               ensure_ascii=False,
+                                               separators=(',', ':')).encode('utf-8'))
+        with open(file_path, 'ab') as file:
+            file.write(_RECORD_HEADER.pack(_RECORD_MAGIC, len(data)))
+            file.write(data)
+
+    def get_sizes(self) -> dict:
+        """
+        :return: dict{object key: (path, size)}
+        """
+        return {db_object: (path, size) for db_object, path, size in zip(self.objects, self.paths, self.sizes)}
+
+
+def load_snapshots(file_path: str, database: str = None) -> SafeList:
+    """
+    :param database: load only snapshots of this database (optional, all by default)
+    :return: snapshots in order they were appended
+    """
+    snapshots: SafeList = SafeList()
+    with open(file_path, 'rb') as file:
+        while True:
+            header: bytes = file.read(_RECORD_HEADER.size)
+            if len(header) == 0:
+                break
+            magic, length = _RECORD_HEADER.unpack(header)
+            if magic != _RECORD_MAGIC:
+                raise ValueError(f'Invalid snapshot record at {file.tell() - _RECORD_HEADER.size}')
+            data: dict = json.loads(zlib.decompress(file.read(length)).decode('utf-8'))
+            if database is not None and data['database'] != database:
+                continue
+            snapshots.append(Snapshot(data['objects'],
+                                      data['paths'],
+                                      data['sizes'],
+                                      datetime.fromisoformat(data['timestamp']),
+                                      data['database']))
+    return snapshots
+
+
+def diff_snapshots(*snapshots: Snapshot, level: int = 2) -> SafeList:
+    """
+    Relations are aligned by object key, sizes are summed per 1C metadata object - first "level" segments
+    of tree path from the latest snapshot containing the relation.
+
+    :param snapshots: two or more snapshots in chronological order
+    :param level: path segments identifying metadata object (optional, default to 2, e.g. "Document.Sales")
+    :return: list[tuple(metadata object, tuple(size per snapshot), growth)] sorted by growth descending
+    """
+    if len(snapshots) < 2:
+        raise TypeError('at least two snapshots must be defined')
+    paths: dict = dict()
+    snapshot_sizes: list = []
+    for snapshot in snapshots:
+        sizes: dict = snapshot.get_sizes()
+        for db_object, (path, size) in sizes.items():
+            paths[db_object] = '.'.join(path.split('.')[:level])
+        snapshot_sizes.append(sizes)
+    metadata_sizes: dict = dict()
+    for db_object, path in paths.items():
+        sizes: list = metadata_sizes.setdefault(path, [0] * len(snapshots))
+        for index, snapshot in enumerate(snapshot_sizes):
+            sizes[index] += snapshot.get(db_object, (None, 0))[1]
+    return SafeList(sorted(((path, tuple(sizes), sizes[-1] - sizes[0]) for path, sizes in metadata_sizes.items()),
+                           key=lambda element: element[2],
+                           reverse=True))
@@ -0,0 +1,293 @@
+import codecs
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import re
+import struct
+from collections.abc import Mapping
+
+PAYLOAD_NAMES: tuple = ('fields', 'index')
+_WHITESPACE: re.Pattern = re.compile(r'[ \t\n\r]*')
+_CACHE_MAGIC: bytes = b'DBSA1C' + bytes((2, marshal.version))
+_CACHE_HEADER: struct.Struct = struct.Struct('<8sQQ32sQQ')
+_CACHE_OFFSET: struct.Struct = struct.Struct('<Q')
+_CACHE_RECORD: struct.Struct = struct.Struct('<BII')
+
+
+class _StructPayload(Mapping):
+    """
+    "fields" or "index" payload of 1C structure element, decoded on first access by subclass.
+    Payload is pickled as plain dict.
+    """
+    __slots__ = ('__data',)
+
+    def __init__(self):
+        self.__data: dict = None
+
+    def _decode(self) -> dict:
+        raise NotImplementedError
+
+    def to_dict(self) -> dict:
+        if self.__data is None:
+            self.__data = self._decode()
+        return self.__data
+
+    def __getitem__(self, item):
+        return self.to_dict()[item]
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def __reduce__(self) -> tuple:
+        return dict, (self.to_dict(),)
+
+
+class LazyStructPayload(_StructPayload):
+    """
+    Payload parsed from structure file on first access.
+    """
+    __slots__ = ('__file_path', '__offset', '__length', '__name')
+
+    def __init__(self, file_path: str, offset: int, length: int, name: str):
+        """
+        :param offset: byte offset of JSON object containing payload in file
+        :param length: byte length of JSON object containing payload in file
+        :param name: payload name
+        """
+        super().__init__()
+        self.__file_path: str = file_path
+        self.__offset: int = offset
+        self.__length: int = length
+        self.__name: str = name
+
+    def _decode(self) -> dict:
+        with open(self.__file_path, 'rb') as file:
+            file.seek(self.__offset)
+            element: dict = json.loads(file.read(self.__length).decode('utf-8'))
+        return element.get(self.__name, dict())
+
+
+def iter_1c_database_struct(file_path: str, chunk_size: int = 1 << 20):
+    """
+    Incremental parser of structure file, only one element is parsed at a time.
+
+    :param chunk_size: bytes read from file at once (optional, default to 1 MB)
+    :return: generator of (key, element, byte offset of element, byte length of element)
+    """
+    decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder('utf-8')()
+    json_decoder: json.JSONDecoder = json.JSONDecoder()
+    with open(file_path, 'rb') as file:
+        data: bytes = file.read(max(chunk_size, len(codecs.BOM_UTF8)))
+        eof: bool = len(data) == 0
+        offset: int = 0
+        if data.startswith(codecs.BOM_UTF8):
+            data = data[len(codecs.BOM_UTF8):]
+            offset = len(codecs.BOM_UTF8)
+        buffer: str = decoder.decode(data)
+        offset_position: int = 0
+        position: int = _WHITESPACE.match(buffer, 0).end()
+        started: bool = False
+        while True:
+            try:
+                if position >= len(buffer):
+                    raise IndexError
+                if not started:
+                    if buffer[position] != '{':
+                        raise json.JSONDecodeError('Expecting "{"', buffer, position)
+                    started = True
+                    position = _WHITESPACE.match(buffer, position + 1).end()
+                    continue
+                if buffer[position] == '}':
+                    return
+                if buffer[position] == ',':
+                    position = _WHITESPACE.match(buffer, position + 1).end()
+                    continue
+                if buffer[position] != '"':
+                    raise json.JSONDecodeError('Expecting property name', buffer, position)
+                key, end = json.decoder.scanstring(buffer, position + 1)
+                end = _WHITESPACE.match(buffer, end).end()
+                if end >= len(buffer):
+                    raise IndexError
+                if buffer[end] != ':':
+                    raise json.JSONDecodeError('Expecting ":"', buffer, end)
+                value_start: int = _WHITESPACE.match(buffer, end + 1).end()
+                value, value_end = json_decoder.raw_decode(buffer, value_start)
+                if value_end == len(buffer) and not eof:
+                    raise IndexError
+            except (json.JSONDecodeError, IndexError) as error:
+                if eof and type(error) == IndexError:
+                    raise json.JSONDecodeError('Unexpected end of data', buffer, len(buffer))
+                if eof:
+                    raise
+                data: bytes = file.read(max(chunk_size, len(buffer)))
+                eof: bool = len(data) == 0
+                buffer = buffer[offset_position:] + decoder.decode(data, eof)
+                position = _WHITESPACE.match(buffer, position - offset_position).end()
+                offset_position = 0
+                continue
+            value_offset: int = offset + len(buffer[offset_position:value_start].encode('utf-8'))
+            value_length: int = len(buffer[value_start:value_end].encode('utf-8'))
+            yield key, value, value_offset, value_length
+            offset = value_offset + value_length
+            offset_position = position = value_end
+            position = _WHITESPACE.match(buffer, position).end()
+
+
+class Struct1CCache(Mapping):
+    """
+    Memory-mapped binary cache of structure file, stored next to it as "<file_path>.cache".
+    Cache is valid while size and mtime of structure file match, on mtime mismatch content hash is compared.
+    Stale cache is rebuilt automatically.
+
+    Layout: header (magic with marshal version, file size, file mtime_ns, sha256 of file, count, keys length),
+    keys as JSON array, record offsets in keys order, records (payload flags, element length, payloads length,
+    element data, payloads data). Element data is marshalled element without "fields" and "index", payloads
+    data is marshalled dict of not empty "fields" and "index". Keys index is built on first lookup, decoded
+    elements are kept in memory.
+    """
+
+    def __init__(self, file_path: str, payloads: str = 'lazy'):
+        """
+        :param payloads: "load", "skip" or "lazy" - how "fields" and "index" of elements are loaded
+                         (optional, default to "lazy")
+        """
+        if payloads not in ('load', 'skip', 'lazy'):
+            raise AttributeError('Unsupported payloads mode')
+        self.__file_path: str = file_path
+        self.__payloads: str = payloads
+        self.cache_path: str = f'{file_path}.cache'
+        if not self.__is_valid():
+            self.__build()
+        with open(self.cache_path, 'rb') as file:
+            self.__data: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        header: tuple = _CACHE_HEADER.unpack_from(self.__data, 0)
+        self.__count: int = header[4]
+        self.__keys_length: int = header[5]
+        self.__indexes: dict = None
+        self.__elements: dict = dict()
+
+    def close(self):
+        self.__data.close()
+
+    def __is_valid(self) -> bool:
+        try:
+            with open(self.cache_path, 'rb') as file:
+                magic, size, mtime_ns, digest, count, keys_length = \
+                    _CACHE_HEADER.unpack(file.read(_CACHE_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        stat: os.stat_result = os.stat(self.__file_path)
+        if magic != _CACHE_MAGIC or size != stat.st_size:
+            return False
+        if mtime_ns == stat.st_mtime_ns:
+            return True
+        if digest != get_file_digest(self.__file_path):
+            return False
+        with open(self.cache_path, 'r+b') as file:
+            file.write(_CACHE_HEADER.pack(magic, size, stat.st_mtime_ns, digest, count, keys_length))
+        return True
+
+    def __build(self):
+        stat: os.stat_result = os.stat(self.__file_path)
+        keys: list = []
+        records: list = []
+        for key, element, offset, length in iter_1c_database_struct(self.__file_path):
+            flags: int = 0
+            payloads: dict = dict()
+            for index, name in enumerate(PAYLOAD_NAMES):
+                payload: dict = element.pop(name, None)
+                if payload is not None and len(payload) > 0:
+                    flags |= 1 << index
+                    payloads[name] = payload
+            keys.append(key)
+            records.append((flags, marshal.dumps(element), marshal.dumps(payloads) if flags else b''))
+        keys_data: bytes = json.dumps(keys, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        temp_path: str = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(_CACHE_HEADER.pack(_CACHE_MAGIC, stat.st_size, stat.st_mtime_ns,
+                                          get_file_digest(self.__file_path), len(records), len(keys_data)))
+            file.write(keys_data)
+            record_offset: int = _CACHE_HEADER.size + len(keys_data) + _CACHE_OFFSET.size * len(records)
+            for flags, element, payloads in records:
+                file.write(_CACHE_OFFSET.pack(record_offset))
+                record_offset += _CACHE_RECORD.size + len(element) + len(payloads)
+            for flags, element, payloads in records:
+                file.write(_CACHE_RECORD.pack(flags, len(element), len(payloads)))
+                file.write(element)
+                file.write(payloads)
+        os.replace(temp_path, self.cache_path)
+
+    def __get_keys(self) -> list:
+        return json.loads(self.__data[_CACHE_HEADER.size:_CACHE_HEADER.size + self.__keys_length].decode('utf-8'))
+
+    def __getitem__(self, item: str) -> dict:
+        element: dict = self.__elements.get(item)
+        if element is not None:
+            return element
+        if self.__indexes is None:
+            self.__indexes = {key: index for index, key in enumerate(self.__get_keys())}
+        element = self.__get_element(self.__indexes[item])
+        self.__elements[item] = element
+        return element
+
+    def __get_element(self, index: int) -> dict:
+        record_offset: int = _CACHE_OFFSET.unpack_from(
+            self.__data, _CACHE_HEADER.size + self.__keys_length + _CACHE_OFFSET.size * index)[0]
+        flags, element_length, payloads_length = _CACHE_RECORD.unpack_from(self.__data, record_offset)
+        element_start: int = record_offset + _CACHE_RECORD.size
+        payloads_start: int = element_start + element_length
+        element: dict = marshal.loads(self.__data[element_start:payloads_start])
+        if self.__payloads == 'load' and flags:
+            element.update(self.get_payloads(payloads_start, payloads_length))
+        elif self.__payloads == 'lazy':
+            for bit, name in enumerate(PAYLOAD_NAMES):
+                if flags & 1 << bit:
+                    element[name] = _CachedStructPayload(self, payloads_start, payloads_length, name)
+        return element
+
+    def get_payloads(self, offset: int, length: int) -> dict:
+        """
+        :return: dict of not empty payloads stored in cache at offset
+        """
+        return marshal.loads(self.__data[offset:offset + length])
+
+    def __iter__(self):
+        if self.__indexes is not None:
+            return iter(self.__indexes)
+        return iter(self.__get_keys())
+
+    def __len__(self):
+        return self.__count
+
+
+class _CachedStructPayload(_StructPayload):
+    """
+    Payload decoded from cache on first access.
+    """
+    __slots__ = ('__cache', '__offset', '__length', '__name')
+
+    def __init__(self, cache: Struct1CCache, offset: int, length: int, name: str):
+        super().__init__()
+        self.__cache: Struct1CCache = cache
+        self.__offset: int = offset
+        self.__length: int = length
+        self.__name: str = name
+
+    def _decode(self) -> dict:
+        return self.__cache.get_payloads(self.__offset, self.__length).get(self.__name, dict())
+
+
+def get_file_digest(file_path: str) -> bytes:
+    """
+    :return: sha256 of file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for data in iter(lambda: file.read(1 << 20), b''):
+            digest.update(data)
+    return digest.digest()
@@ -0,0 +1,11 @@
+from db_size_analysis_1c_psql import create_multiple_db_size_analysis
+import getpass
+
+if __name__ == '__main__':
+    host: str = '192.168.1.100'
+    databases: list = [database.strip() for database in input('DataBase names (comma separated): ').split(',')]
+    user: str = input('User name: ').strip()
+    password: str = getpass.getpass('Password: ').strip()
+    analysis = create_multiple_db_size_analysis(host, databases, user, password, '1C_struct.json')
+    analysis.sort('size', True)
+    analysis.export_to_excel('export.xlsx', write_only=True)
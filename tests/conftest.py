@@ -0,0 +1,96 @@
+"""
+Helpers shared by tests and benchmarks, importable without pytest.
+"""
+import codecs
+import json
+import os
+import threading
+import time
+
+
+class FakePsycopg2:
+    """
+    Replacement of psycopg2 module: every query returns rows, or result of execute callback if defined.
+    """
+
+    def __init__(self, rows: list = (), connect_delay: float = 0, execute=None):
+        """
+        :param connect_delay: seconds connect blocks for (optional, default to 0)
+        :param execute: callable(connection, query, params) returning rows or raising (optional)
+        """
+        self.rows: list = list(rows)
+        self.connect_delay: float = connect_delay
+        self.execute = execute
+        self.connections: list = []
+
+    def connect(self, host: str = None, dbname: str = None, user: str = None, password: str = None):
+        time.sleep(self.connect_delay)
+        connection: FakeConnection = FakeConnection(self, dbname)
+        self.connections.append(connection)
+        return connection
+
+
+class FakeConnection:
+
+    def __init__(self, psycopg2: FakePsycopg2, database: str):
+        self.psycopg2: FakePsycopg2 = psycopg2
+        self.database: str = database
+        self.cancelled: threading.Event = threading.Event()
+        self.closed: bool = False
+
+    def cursor(self, name: str = None):
+        return FakeCursor(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+
+    def __init__(self, connection: FakeConnection):
+        self.__connection: FakeConnection = connection
+        self.__rows: list = []
+        self.itersize: int = 2000
+
+    def execute(self, query: str, params: tuple = None):
+        psycopg2: FakePsycopg2 = self.__connection.psycopg2
+        if psycopg2.execute is None:
+            self.__rows = list(psycopg2.rows)
+        else:
+            self.__rows = list(psycopg2.execute(self.__connection, query, params))
+
+    def fetchall(self) -> list:
+        rows: list = self.__rows
+        self.__rows = []
+        return rows
+
+    def fetchmany(self, size: int) -> list:
+        rows: list = self.__rows[:size]
+        self.__rows = self.__rows[size:]
+        return rows
+
+    def __iter__(self):
+        rows: list = self.__rows
+        self.__rows = []
+        return iter(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def write_struct_1c(file_path: str, struct_1c: dict, indent: int = None, bom: bool = False):
+    """
+    Modification time of rewritten file is increased, so rewrite is seen on file systems with coarse timestamps.
+    """
+    mtime_ns: int = os.stat(file_path).st_mtime_ns + 1000 if os.path.exists(file_path) else None
+    with open(file_path, 'wb') as file:
+        file.write((codecs.BOM_UTF8 if bom else b'') + json.dumps(struct_1c, ensure_ascii=False,
+                                                                   indent=indent).encode('utf-8'))
+    if mtime_ns is not None:
+        os.utime(file_path, ns=(mtime_ns, mtime_ns))
@@ -0,0 +1,133 @@
+import csv
+import os
+
+import openpyxl
+import pytest
+from conftest import write_struct_1c
+
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject
+from db_size_analysis_1c_psql.db_size_analysis_1c_psql import compile_db_objects_with_1c_struct, \
+    load_1c_database_struct
+
+
+def create_tree(sizes: dict) -> DataBaseObject:
+    data: DataBaseObject = DataBaseObject('DataBase')
+    for key, size in sizes.items():
+        data[key] = DataBaseObject(size=size)
+        data.size += size
+    return data
+
+
+def test_prune_top():
+    data: DataBaseObject = create_tree({'A': 5, 'B': 100, 'C': 1, 'D': 7})
+    pruned: DataBaseObject = data.prune(top=2)
+    assert {key: child.size for key, child in pruned.children.items()} == {'B': 100, 'D': 7, 'Other': 6}
+    assert pruned.size == 113
+    assert len(data.children) == 4
+
+
+def test_prune_min_size_and_max_depth():
+    data: DataBaseObject = create_tree({'A': 5, 'B': 100})
+    data['B']['C'] = DataBaseObject(size=100)
+    pruned: DataBaseObject = data.prune(min_size=10, max_depth=1)
+    assert {key: child.size for key, child in pruned.children.items()} == {'B': 100, 'Other': 5}
+    assert len(pruned['B'].children) == 0
+
+
+def test_prune_other_name_clash():
+    data: DataBaseObject = create_tree({'A': 5, 'Other': 100, 'B': 1})
+    pruned: DataBaseObject = data.prune(top=1)
+    assert {key: child.size for key, child in pruned.children.items()} == {'Other': 100, 'Other (2)': 6}
+    assert sum(child.size for child in pruned.children.values()) == pruned.size == 106
+
+
+def test_prune_other_name_clash_with_numbered_name():
+    data: DataBaseObject = create_tree({'Other': 100, 'Other (2)': 50, 'A': 1})
+    pruned: DataBaseObject = data.prune(top=2)
+    assert {key: child.size for key, child in pruned.children.items()} == {'Other': 100, 'Other (2)': 50,
+                                                                           'Other (3)': 1}
+
+
+def test_name_of_linked_object_is_read_only():
+    data: DataBaseObject = create_tree({'A': 5})
+    with pytest.raises(AttributeError):
+        data['A'].name = 'B'
+    assert data['A'].name == 'DataBase.A'
+    data.name = 'Root'
+    assert data['A'].name == 'Root.A'
+
+
+def test_export_to_excel_parts(tmp_path):
+    data: DataBaseObject = create_tree({'Document': 10, 'Catalog': 5})
+    data['Document']['Sales'] = DataBaseObject(size=10)
+    index_path: str = data.export_to_excel_parts(str(tmp_path), max_workers=2)
+    index: list = [row[:3] for row in openpyxl.load_workbook(index_path).active.iter_rows(values_only=True)]
+    assert index[2:] == [('DataBase.Document', '10 B', '001_Document.xlsx'),
+                         ('DataBase.Catalog', '5 B', '002_Catalog.xlsx')]
+    part: openpyxl.Workbook = openpyxl.load_workbook(os.path.join(tmp_path, '001_Document.xlsx'))
+    names: list = [row[0] for row in part.active.iter_rows(min_row=2, values_only=True) if row[0] is not None]
+    assert names == ['DataBase.Document', 'DataBase.Document.Sales']
+    assert data['Document'].key == 'Document'
+
+
+def test_export_to_excel_parts_with_cached_lazy_payloads(tmp_path):
+    struct_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(struct_path, {'_document1': {'table_name_dbms': '_Document1', 'table_name_1c': 'Document.Sales',
+                                                 'metadata': 'Document.Sales', 'purpose': 'Main',
+                                                 'fields': {'_fld1': {'name': 'Amount', 'type': 'N'}},
+                                                 'index': {'_document1_byid': ['_idrref']}}})
+    db_objects: list = [DataBaseObject(namespace='public', parent_object='_document1', object='_document1', size=10),
+                        DataBaseObject(namespace='public', parent_object=None, object='config', size=5)]
+    data: DataBaseObject = compile_db_objects_with_1c_struct(
+        db_objects, load_1c_database_struct(struct_path, payloads='lazy', cache=True), True)
+    index_path: str = data.export_to_excel_parts(str(tmp_path / 'parts'), max_workers=2)
+    part: openpyxl.Workbook = openpyxl.load_workbook(os.path.join(os.path.dirname(index_path), '001_Document.xlsx'))
+    assert [row[:5] for row in part.active.iter_rows(min_row=2, values_only=True) if row[0] is not None] == \
+        [('DataBase.Document', '10 B', None, None, None),
+         ('DataBase.Document.Sales', '10 B', None, '_Document1', 'Document.Sales')]
+    assert dict(data['Document']['Sales'].fields) == {'_fld1': {'name': 'Amount', 'type': 'N'}}
+
+
+def create_flat_tree() -> DataBaseObject:
+    data: DataBaseObject = DataBaseObject('DataBase', size=18)
+    data['Document'] = DataBaseObject(size=13)
+    data['Document']['Sales'] = DataBaseObject(size=13, table_name_dbms='_Document1', table_name_1c='Document.Sales',
+                                               metadata='Document.Sales', purpose='Main')
+    data['Document']['Sales']['Goods'] = DataBaseObject(size=3, table_name_dbms='_Document1_VT2', purpose='VT')
+    data['Catalog'] = DataBaseObject(size=5)
+    for data_base_object, components in ((data, (10, 4, 3, 1)), (data['Document']['Sales'], (8, 2, 3, 1))):
+        data_base_object.heap_size, data_base_object.toast_size, data_base_object.indexes_size, \
+            data_base_object.bloat_size = components
+    return data
+
+
+def test_export_to_csv(tmp_path):
+    data: DataBaseObject = create_flat_tree()
+    file_path: str = data.export_to_csv(str(tmp_path / 'analysis.csv'), delimiter=';')
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        rows: list = list(csv.reader(file, delimiter=';'))
+    assert rows == [list(DataBaseObject.flat_header + DataBaseObject.flat_components_header),
+                    ['DataBase', '0', '18', '', '', '', '', '10', '4', '3', '1'],
+                    ['DataBase.Document', '1', '13', '', '', '', '', '0', '0', '0', '0'],
+                    ['DataBase.Document.Sales', '2', '13', '_Document1', 'Document.Sales', 'Document.Sales', 'Main',
+                     '8', '2', '3', '1'],
+                    ['DataBase.Document.Sales.Goods', '3', '3', '_Document1_VT2', '', '', 'VT', '0', '0', '0', '0'],
+                    ['DataBase.Catalog', '1', '5', '', '', '', '', '0', '0', '0', '0']]
+    data.export_to_csv(file_path, components=False)
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(DataBaseObject.flat_header)
+    assert [row[:2] for row in rows[1:]] == [['DataBase', '0'], ['DataBase.Document', '1'],
+                                             ['DataBase.Document.Sales', '2'],
+                                             ['DataBase.Document.Sales.Goods', '3'], ['DataBase.Catalog', '1']]
+
+
+def test_export_to_parquet(tmp_path):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    data: DataBaseObject = create_flat_tree()
+    file_path: str = data.export_to_parquet(str(tmp_path / 'analysis.parquet'), batch_size=2)
+    parquet_file = pyarrow_parquet.ParquetFile(file_path)
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == list(DataBaseObject.flat_header + DataBaseObject.flat_components_header)
+    assert [tuple(row.values()) for row in table.to_pylist()] == list(data.iter_flat_rows(True))
@@ -0,0 +1,38 @@
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject
+from db_size_analysis_1c_psql.data_base_tree_builder import DataBaseTreeBuilder
+
+
+def test_build_sums_subtree_sizes():
+    builder: DataBaseTreeBuilder = DataBaseTreeBuilder()
+    builder.add(('Document', 'Sales', 'TabularSection'), DataBaseObject(size=3, object='_document1_vt2'))
+    builder.add(('Document', 'Sales'), DataBaseObject(size=10, object='_document1'))
+    builder.add(('Catalog', 'Goods'), DataBaseObject(size=5, object='_reference3'))
+    data: DataBaseObject = builder.build()
+    assert data.name == 'DataBase'
+    assert data.size == 18
+    assert list(data.children) == ['Document', 'Catalog']
+    assert data['Document'].size == 13
+    assert data['Document']['Sales'].size == 13
+    assert data['Document']['Sales'].object == '_document1'
+    assert data['Document']['Sales']['TabularSection'].name == 'DataBase.Document.Sales.TabularSection'
+    assert data['Document']['Sales']['TabularSection'].parent is data['Document']['Sales']
+
+
+def test_build_sums_objects_of_same_path():
+    builder: DataBaseTreeBuilder = DataBaseTreeBuilder()
+    builder.add(('Service', 'config'), DataBaseObject(size=2, object='config'))
+    builder.add(('Service', 'config'), DataBaseObject(size=5, object='config', namespace='public'))
+    data: DataBaseObject = builder.build()
+    assert data.size == 7
+    assert data['Service']['config'].size == 7
+    assert data['Service']['config'].namespace == 'public'
+
+
+def test_builder_is_reset_after_build():
+    builder: DataBaseTreeBuilder = DataBaseTreeBuilder('Root')
+    builder.add(('A',), DataBaseObject(size=1))
+    builder.build()
+    data: DataBaseObject = builder.build()
+    assert data.name == 'Root'
+    assert data.size == 0
+    assert len(data.children) == 0
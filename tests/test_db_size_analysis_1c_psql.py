@@ -0,0 +1,85 @@
+import threading
+import time
+
+import openpyxl
+import pytest
+from conftest import FakePsycopg2
+
+from db_size_analysis_1c_psql import db_size_analysis_1c_psql as analysis
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject
+
+STRUCT_1C: dict = {'_document1': {'table_name_1c': 'Document.Sales', 'metadata': 'Document.Sales'},
+                   '_document1_vt2': {'table_name_1c': 'Document.Sales.TabularSection.Goods',
+                                      'metadata': 'Document.Sales'}}
+# (server_side_parsing, aggregate, rows with components)
+ROW_SHAPES: list = [(False, False, [('public._document1', 100, 60, 20, 20, 6),
+                                    ('public._document1_vt2', 40, 30, 0, 10, 3),
+                                    ('public.config', 8, 8, 0, 0, 0)]),
+                    (True, False, [('public', '_document1', '_document1', 100, 60, 20, 20, 6),
+                                   ('public', '_document1', '_document1_vt2', 40, 30, 0, 10, 3),
+                                   ('public', None, 'config', 8, 8, 0, 0, 0)]),
+                    (True, True, [('public', '_document1', '_document1', 100, 60, 20, 20, 6),
+                                  ('public', '_document1', '_document1_vt2', 40, 30, 0, 10, 3),
+                                  ('public', None, 'config', 8, 8, 0, 0, 0)])]
+EXPECTED_OBJECTS: list = [('public', '_document1', '_document1', 100, 60, 20, 20, 6),
+                          ('public', '_document1', '_document1_vt2', 40, 30, 0, 10, 3),
+                          ('public', None, 'config', 8, 8, 0, 0, 0)]
+
+
+def to_tuple(db_object: DataBaseObject) -> tuple:
+    return (db_object.namespace, db_object.get_attribute('parent_object'), db_object.object, db_object.size,
+            db_object.heap_size, db_object.toast_size, db_object.indexes_size, db_object.bloat_size)
+
+
+@pytest.mark.parametrize('server_side_parsing, aggregate, rows', ROW_SHAPES)
+def test_get_psql_objects_with_size_components(monkeypatch, server_side_parsing, aggregate, rows):
+    monkeypatch.setattr(analysis, 'psycopg2', FakePsycopg2(rows))
+    db_objects: list = analysis.get_psql_objects_with_size('', '', '', '', server_side_parsing, aggregate,
+                                                           components=True)
+    assert [to_tuple(db_object) for db_object in db_objects] == EXPECTED_OBJECTS
+    assert [to_tuple(analysis.create_db_object(row, server_side_parsing, True)) for row in rows] == EXPECTED_OBJECTS
+
+
+def test_size_components_roll_up_and_export_to_excel(monkeypatch, tmp_path):
+    monkeypatch.setattr(analysis, 'psycopg2', FakePsycopg2(ROW_SHAPES[0][2]))
+    data: DataBaseObject = analysis.compile_db_objects_with_1c_struct(
+        analysis.get_psql_objects_with_size('', '', '', '', components=True), STRUCT_1C, True)
+    assert (data.size, data.heap_size, data.toast_size, data.indexes_size, data.bloat_size) == (148, 98, 20, 30, 9)
+    sales: DataBaseObject = data['Document']['Sales']
+    assert (sales.size, sales.heap_size, sales.toast_size, sales.indexes_size, sales.bloat_size) == \
+        (140, 90, 20, 30, 9)
+    assert data.has_components()
+    for write_only in (False, True):
+        file_path: str = str(tmp_path / f'analysis_{write_only}.xlsx')
+        data.export_to_excel(file_path, write_only=write_only)
+        rows: list = [row for row in openpyxl.load_workbook(file_path).active.iter_rows(values_only=True)
+                      if row[0] is not None]
+        assert rows[0] == DataBaseObject.excel_header + DataBaseObject.excel_components_header
+        assert rows[1][0] == 'DataBase'
+        assert rows[1][-4:] == ('98 B', '20 B', '30 B', '9 B')
+        sales_row: tuple = next(row for row in rows if row[0] == 'DataBase.Document.Sales')
+        assert sales_row[-4:] == ('90 B', '20 B', '30 B', '9 B')
+
+
+def test_multiple_analysis_does_not_wait_for_other_scans(monkeypatch):
+    released: threading.Event = threading.Event()
+    started: list = []
+
+    def get_psql_objects_with_size(host: str, database: str, *args):
+        started.append(database)
+        if database == 'failing':
+            raise RuntimeError('query failed')
+        released.wait(5)
+        return []
+
+    monkeypatch.setattr(analysis, 'get_psql_objects_with_size', get_psql_objects_with_size)
+    monkeypatch.setattr(analysis, 'load_1c_database_struct', lambda *args, **kwargs: dict())
+    start: float = time.perf_counter()
+    try:
+        with pytest.raises(RuntimeError):
+            analysis.create_multiple_db_size_analysis('', ['slow', 'failing', 'queued1', 'queued2'], '', '',
+                                                      'struct.json', max_workers=2)
+        assert time.perf_counter() - start < 2
+        assert 'queued2' not in started
+    finally:
+        released.set()
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from conftest import FakeConnection, FakePsycopg2
+
+from db_size_analysis_1c_psql import db_size_analysis_1c_psql_async as analysis_async
+
+ROWS: list = [('public._document1', 10), ('public._document1_vt2', 5), ('public.config', 3)]
+STRUCT_1C: dict = {'_document1': {'table_name_1c': 'Document.Sales', 'metadata': 'Document.Sales'},
+                   '_document1_vt2': {'table_name_1c': 'Document.Sales.TabularSection.Goods',
+                                      'metadata': 'Document.Sales'}}
+
+
+def execute(connection: FakeConnection, query: str, params: tuple = None) -> list:
+    if connection.database == 'failing':
+        raise RuntimeError('query failed')
+    if connection.database == 'slow':
+        connection.cancelled.wait(5)
+        raise RuntimeError('query cancelled')
+    return ROWS
+
+
+@pytest.fixture
+def loads(monkeypatch) -> list:
+    loads: list = []
+
+    def load_1c_database_struct(file_path: str, payloads: str = 'load', cache: bool = False) -> dict:
+        loads.append(file_path)
+        return STRUCT_1C
+
+    monkeypatch.setattr(analysis_async, 'load_1c_database_struct', load_1c_database_struct)
+    return loads
+
+
+def test_create_db_size_analysis_async(monkeypatch, loads):
+    psycopg2: FakePsycopg2 = FakePsycopg2(execute=execute)
+    monkeypatch.setattr(analysis_async, 'psycopg2', psycopg2)
+    data = asyncio.run(analysis_async.create_db_size_analysis_async('', 'db', '', '', 'struct.json', itersize=2))
+    assert data.size == 18
+    assert data['Document']['Sales'].size == 15
+    assert data['Service']['config'].size == 3
+    assert psycopg2.connections[0].closed
+
+
+def test_create_multiple_db_size_analysis_async_loads_struct_once(monkeypatch, loads):
+    monkeypatch.setattr(analysis_async, 'psycopg2', FakePsycopg2(execute=execute))
+    data = asyncio.run(analysis_async.create_multiple_db_size_analysis_async('', ['db1', 'db2', 'db3'], '', '',
+                                                                            'struct.json'))
+    assert list(data.children) == ['db1', 'db2', 'db3']
+    assert data.size == 54
+    assert loads == ['struct.json']
+
+
+def test_create_multiple_db_size_analysis_async_cancels_on_error(monkeypatch, loads):
+    psycopg2: FakePsycopg2 = FakePsycopg2(execute=execute)
+    monkeypatch.setattr(analysis_async, 'psycopg2', psycopg2)
+
+    async def analyse():
+        with pytest.raises(RuntimeError, match='query failed'):
+            await analysis_async.create_multiple_db_size_analysis_async('', ['slow', 'failing'], '', '',
+                                                                        'struct.json')
+        slow: FakeConnection = next(connection for connection in psycopg2.connections
+                                    if connection.database == 'slow')
+        assert slow.cancelled.is_set()
+        assert all(connection.closed for connection in psycopg2.connections)
+
+    asyncio.run(analyse())
+
+
+def test_create_db_size_analysis_async_timeout_closes_connection(monkeypatch, loads):
+    psycopg2: FakePsycopg2 = FakePsycopg2(connect_delay=0.2, execute=execute)
+    monkeypatch.setattr(analysis_async, 'psycopg2', psycopg2)
+
+    async def analyse():
+        with pytest.raises(asyncio.TimeoutError):
+            await analysis_async.create_db_size_analysis_async('', 'db', '', '', 'struct.json', timeout=0.05)
+        await asyncio.sleep(0.4)
+
+    asyncio.run(analyse())
+    assert len(psycopg2.connections) == 1
+    assert psycopg2.connections[0].closed
@@ -0,0 +1,27 @@
+import openpyxl
+
+from db_size_analysis_1c_psql.excel_processor import ExcelProcessor
+
+
+def test_optimal_column_widths_keep_loaded_cells(tmp_path):
+    file_path: str = str(tmp_path / 'loaded.xlsx')
+    workbook: openpyxl.Workbook = openpyxl.Workbook()
+    workbook.active['A1'] = 'x' * 40
+    workbook.save(file_path)
+    excel: ExcelProcessor = ExcelProcessor(file_path)
+    excel.add_row('x')
+    excel.set_optimal_column_widths()
+    excel.save(file_path)
+    assert openpyxl.load_workbook(file_path).active.column_dimensions['A'].width == 41
+
+
+def test_optimal_column_widths_of_added_rows(tmp_path):
+    file_path: str = str(tmp_path / 'new.xlsx')
+    excel: ExcelProcessor = ExcelProcessor()
+    excel.add_row('abc', 'abcdefgh')
+    excel.add_row('abcde')
+    excel.set_optimal_column_widths()
+    excel.save(file_path)
+    sheet = openpyxl.load_workbook(file_path).active
+    assert sheet.column_dimensions['A'].width == 6
+    assert sheet.column_dimensions['B'].width == 9
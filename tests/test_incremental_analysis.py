@@ -0,0 +1,136 @@
+import random
+
+import pytest
+from conftest import FakeConnection, FakePsycopg2, write_struct_1c
+
+from db_size_analysis_1c_psql import incremental_analysis
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject
+from db_size_analysis_1c_psql.incremental_analysis import IncrementalAnalysis, get_psql_relations_state_request
+
+
+class FakeCatalog:
+    """
+    Relations: dict{relation: [oid, relfilenode, relpages, writes, sizes (total, heap, toast, indexes, bloat)]}
+    """
+
+    def __init__(self):
+        self.relations: dict = dict()
+        self.queries: list = []
+        self.__oid: int = 0
+
+    def add(self, relation: str, size: int):
+        self.__oid += 1
+        self.relations[relation] = [self.__oid, self.__oid, 1, 0, get_sizes(size)]
+
+    def execute(self, connection: FakeConnection, query: str, params: tuple = None) -> list:
+        if query == get_psql_relations_state_request():
+            return [(relation, oid, relfilenode, relpages, 0, 0, writes, 0)
+                    for relation, (oid, relfilenode, relpages, writes, sizes) in self.relations.items()]
+        self.queries.append(params)
+        oids: set = None if params is None else set(params[0])
+        return [(relation, *sizes) for relation, (oid, relfilenode, relpages, writes, sizes) in self.relations.items()
+                if oids is None or oid in oids]
+
+
+def get_sizes(size: int) -> list:
+    return [size, size // 2, size // 4, size // 8, size // 16]
+
+
+def get_struct_1c(tables: dict) -> dict:
+    """
+    :param tables: dict{table name: metadata}
+    """
+    return {table: {'table_name_dbms': table, 'table_name_1c': f'{metadata}.{table}', 'metadata': metadata,
+                    'purpose': 'Main', 'fields': {}, 'index': {}}
+            for table, metadata in tables.items()}
+
+
+def to_tuple(data_base_object: DataBaseObject) -> tuple:
+    return (data_base_object.size, data_base_object.heap_size, data_base_object.toast_size,
+            data_base_object.indexes_size, data_base_object.bloat_size, data_base_object.get_attributes(),
+            {key: to_tuple(child) for key, child in data_base_object.children.items()})
+
+
+@pytest.fixture
+def catalog(monkeypatch) -> FakeCatalog:
+    fake_catalog: FakeCatalog = FakeCatalog()
+    monkeypatch.setattr(incremental_analysis, 'psycopg2', FakePsycopg2(execute=fake_catalog.execute))
+    return fake_catalog
+
+
+def test_first_update_measures_all_relations_without_oids(tmp_path, catalog):
+    struct_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(struct_path, get_struct_1c({'_document1': 'Document.Sales'}))
+    catalog.add('public._document1', 100)
+    catalog.add('public.config', 10)
+    analysis: IncrementalAnalysis = IncrementalAnalysis('', '', '', '', struct_path)
+    assert analysis.update() == 2
+    assert catalog.queries == [None]
+    assert analysis.data.size == 110
+    assert analysis.data['Document']['Sales']['_document1'].size == 100
+    assert analysis.update() == 0
+    catalog.relations['public.config'][2] += 1
+    catalog.relations['public.config'][4] = get_sizes(20)
+    assert analysis.update() == 1
+    assert catalog.queries[-1] == ([catalog.relations['public.config'][0]],)
+    assert analysis.data.size == 120
+
+
+def test_struct_1c_change_rebuilds_tree(tmp_path, catalog):
+    struct_path: str = str(tmp_path / 'struct.json')
+    state_path: str = str(tmp_path / 'state.pickle')
+    write_struct_1c(struct_path, get_struct_1c({'_document1': 'Document.Sales'}))
+    catalog.add('public._document1', 100)
+    catalog.add('public._document2', 50)
+    assert IncrementalAnalysis('', '', '', '', struct_path, state_path).update() == 2
+    write_struct_1c(struct_path, get_struct_1c({'_document1': 'Document.Sales'}))
+    assert IncrementalAnalysis('', '', '', '', struct_path, state_path).update() == 0
+    write_struct_1c(struct_path, get_struct_1c({'_document1': 'Document.Sales', '_document2': 'Document.Purchase'}))
+    analysis: IncrementalAnalysis = IncrementalAnalysis('', '', '', '', struct_path, state_path)
+    assert analysis.update() == 2
+    assert catalog.queries[-1] is None
+    assert set(analysis.data.children) == {'Document'}
+    assert analysis.data['Document']['Purchase']['_document2'].size == 50
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_updates_match_full_rebuild(tmp_path, catalog, seed):
+    random_generator: random.Random = random.Random(seed)
+    struct_path: str = str(tmp_path / 'struct.json')
+    state_path: str = str(tmp_path / 'state.pickle')
+    tables: list = [f'_document{number}' for number in range(8)] + \
+                   [f'_document{number}_vt{number}' for number in range(8)] + \
+                   [f'_inforg{number}' for number in range(8)] + ['config', 'params']
+    metadata: dict = {table: f'Document.Document{table.split("_")[1][8:]}' for table in tables
+                      if table.startswith('_document')}
+    write_struct_1c(struct_path, get_struct_1c(metadata))
+    for table in random_generator.sample(tables, 10):
+        catalog.add(f'public.{table}', random_generator.randint(0, 1000))
+    analysis: IncrementalAnalysis = IncrementalAnalysis('', '', '', '', struct_path, state_path, components=True)
+    for step in range(30):
+        action: int = random_generator.randrange(6)
+        relations: list = list(catalog.relations)
+        if action == 0 and len(relations) > 0:
+            relation: list = catalog.relations[random_generator.choice(relations)]
+            relation[2] += 1
+            relation[4] = get_sizes(relation[4][0] + random_generator.randint(1, 1000))
+        elif action == 1 and len(relations) > 0:
+            relation: list = catalog.relations[random_generator.choice(relations)]
+            relation[1] += 1000
+            relation[4] = get_sizes(random_generator.randint(0, 100))
+        elif action == 2:
+            table: str = random_generator.choice(tables)
+            if f'public.{table}' not in catalog.relations:
+                catalog.add(f'public.{table}', random_generator.randint(0, 1000))
+        elif action == 3 and len(relations) > 0:
+            del catalog.relations[random_generator.choice(relations)]
+        elif action == 4:
+            table: str = random_generator.choice(tables)
+            metadata[table] = f'Catalog.Catalog{step}'
+            write_struct_1c(struct_path, get_struct_1c(metadata))
+        elif action == 5:
+            analysis = IncrementalAnalysis('', '', '', '', struct_path, state_path, components=True)
+        analysis.update()
+        rebuilt: IncrementalAnalysis = IncrementalAnalysis('', '', '', '', struct_path, components=True)
+        rebuilt.update()
+        assert to_tuple(analysis.data) == to_tuple(rebuilt.data)
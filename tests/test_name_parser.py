@@ -0,0 +1,37 @@
+import pytest
+
+from db_size_analysis_1c_psql.name_parser import parse_relation, parse_relations
+
+RELATIONS: list = [('public.config', ('public', None, 'config')),
+                   ('public._document12', ('public', '_document12', '_document12')),
+                   ('public._document12_vt34', ('public', '_document12', '_document12_vt34')),
+                   ('public._accumrgt5', ('public', '_accumrgt5', '_accumrgt5')),
+                   ('public._inforg7', ('public', '_inforg7', '_inforg7')),
+                   ('public._const3', ('public', '_const3', '_const3')),
+                   ('public._reference1_vt2_extra', ('public', '_reference1', '_reference1_vt2')),
+                   ('myschema.prefix_node9', ('myschema', '_node9', '_node9'))]
+
+
+@pytest.mark.parametrize('relation, expected', RELATIONS)
+def test_parse_relation(relation: str, expected: tuple):
+    assert parse_relation(relation) == expected
+
+
+@pytest.mark.parametrize('relation, expected', RELATIONS)
+def test_parse_relation_matches_split_rule(relation: str, expected: tuple):
+    names: list = relation.replace('_', '._').split('.')
+    names += [None] * (4 - len(names))
+    assert parse_relation(relation) == (names[0], names[2], (names[2] or names[1]) + (names[3] or ''))
+
+
+def test_parse_relations():
+    namespaces, parent_objects, objects = parse_relations([relation for relation, expected in RELATIONS])
+    assert list(zip(namespaces, parent_objects, objects)) == [expected for relation, expected in RELATIONS]
+    assert parse_relations([]) == ([], [], [])
+
+
+def test_parse_relation_cache_is_bounded():
+    parse_relation.cache_clear()
+    for number in range(10000):
+        parse_relation(f'public._document{number}')
+    assert parse_relation.cache_info().currsize <= 4096
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from db_size_analysis_1c_psql.data_base_object import DataBaseObject
+from db_size_analysis_1c_psql.db_size_analysis_1c_psql import compile_db_objects_with_1c_struct
+from db_size_analysis_1c_psql.snapshot import Snapshot, diff_snapshots, load_snapshots
+
+STRUCT_1C: dict = {'_document1': {'table_name_1c': 'Document.Sales', 'metadata': 'Document.Sales'},
+                   '_document1_vt2': {'table_name_1c': 'Document.Sales.TabularSection.Goods',
+                                      'metadata': 'Document.Sales'},
+                   '_reference3': {'table_name_1c': 'Catalog.Goods', 'metadata': 'Catalog.Goods'}}
+
+
+def create_db_objects(sizes: dict) -> list:
+    """
+    :param sizes: dict{(namespace, object): size}
+    """
+    db_objects: list = [DataBaseObject(namespace=namespace, object=db_object, size=size)
+                        for (namespace, db_object), size in sizes.items()]
+    return compile_db_objects_with_1c_struct(db_objects, STRUCT_1C)
+
+
+def test_from_db_objects_keeps_merged_relations():
+    db_objects: list = create_db_objects({('public', 'config'): 5, ('other', 'config'): 7,
+                                          ('public', '_document1'): 100})
+    snapshot: Snapshot = Snapshot.from_db_objects(db_objects)
+    assert snapshot.get_sizes() == {'public.config': ('Service.config', 5),
+                                    'other.config': ('Service.config', 7),
+                                    'public._document1': ('Document.Sales', 100)}
+    data: DataBaseObject = compile_db_objects_with_1c_struct(db_objects, STRUCT_1C, True)
+    assert data['Service']['config'].size == 12
+
+
+def test_snapshots_round_trip(tmp_path):
+    file_path: str = str(tmp_path / 'snapshots.bin')
+    first: Snapshot = Snapshot.from_db_objects(create_db_objects({('public', '_document1'): 100}),
+                                               datetime(2026, 1, 1, 3), 'trade')
+    second: Snapshot = Snapshot.from_db_objects(create_db_objects({('public', 'config'): 1}),
+                                                datetime(2026, 1, 1, 4), 'salary')
+    third: Snapshot = Snapshot.from_db_objects(create_db_objects({('public', '_document1'): 150,
+                                                                  ('public', 'Таблица'): 1}),
+                                               datetime(2026, 1, 2, 3), 'trade')
+    for snapshot in (first, second, third):
+        snapshot.append_to(file_path)
+    snapshots: list = load_snapshots(file_path)
+    assert [(snapshot.timestamp, snapshot.database, snapshot.get_sizes()) for snapshot in snapshots] == \
+        [(snapshot.timestamp, snapshot.database, snapshot.get_sizes()) for snapshot in (first, second, third)]
+    assert [snapshot.timestamp for snapshot in load_snapshots(file_path, 'trade')] == \
+        [first.timestamp, third.timestamp]
+
+
+def test_load_snapshots_invalid_record(tmp_path):
+    file_path: str = str(tmp_path / 'snapshots.bin')
+    with open(file_path, 'wb') as file:
+        file.write(b'XXXX\0\0\0\0')
+    with pytest.raises(ValueError):
+        load_snapshots(file_path)
+
+
+def test_diff_snapshots():
+    snapshots: list = [Snapshot.from_db_objects(create_db_objects(sizes)) for sizes in (
+        {('public', 'config'): 5, ('public', '_document1'): 100, ('public', '_reference3'): 50},
+        {('public', 'config'): 5, ('other', 'config'): 7, ('public', '_document1'): 100,
+         ('public', '_document1_vt2'): 30, ('public', '_reference3'): 40},
+        {('other', 'config'): 9, ('public', '_document1'): 160, ('public', '_document1_vt2'): 40})]
+    assert list(diff_snapshots(*snapshots)) == [('Document.Sales', (100, 130, 200), 100),
+                                                ('Service.config', (5, 12, 9), 4),
+                                                ('Catalog.Goods', (50, 40, 0), -50)]
+    assert list(diff_snapshots(*snapshots, level=1))[0] == ('Document', (100, 130, 200), 100)
+    with pytest.raises(TypeError):
+        diff_snapshots(snapshots[0])
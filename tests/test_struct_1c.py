@@ -0,0 +1,153 @@
+import json
+import marshal
+import os
+import pickle
+import struct
+
+import pytest
+from conftest import write_struct_1c
+
+from db_size_analysis_1c_psql.struct_1c import LazyStructPayload, PAYLOAD_NAMES, Struct1CCache, get_file_digest, \
+    iter_1c_database_struct
+
+STRUCT_1C: dict = {
+    '_document1': {'table_name_dbms': '_Document1',
+                   'table_name_1c': 'Документ.Реализация',
+                   'metadata': 'Документ.Реализация',
+                   'purpose': 'Основная',
+                   'fields': {'_number': {'name': 'Номер "документа"', 'type': 'S'}},
+                   'index': {'_document1_byid': ['_idrref']}},
+    '_document1_vt2': {'table_name_dbms': '_Document1_VT2',
+                       'table_name_1c': 'Документ.Реализация.ТабличнаяЧасть.Товары',
+                       'metadata': 'Документ.Реализация',
+                       'purpose': 'ТабличнаяЧасть',
+                       'fields': {},
+                       'index': {}},
+    'config': {'table_name_dbms': 'config', 'table_name_1c': '', 'metadata': '', 'purpose': '',
+               'fields': {'filename': {'name': 'filename\\n', 'type': 'S'}}, 'index': {}},
+}
+SCALARS: dict = {'a': 123456, 'b': {'c': [1, 2.5, True, None]}, 'd': 'строка', 'e': -7.25e3, 'f': False, 'g': 0}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 4096])
+@pytest.mark.parametrize('indent', [None, 4])
+@pytest.mark.parametrize('bom', [False, True])
+@pytest.mark.parametrize('struct_1c', [STRUCT_1C, SCALARS])
+def test_iter_1c_database_struct(tmp_path, chunk_size, indent, bom, struct_1c):
+    file_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(file_path, struct_1c, indent, bom)
+    with open(file_path, 'rb') as file:
+        data: bytes = file.read()
+    elements: dict = dict()
+    for key, element, offset, length in iter_1c_database_struct(file_path, chunk_size):
+        assert json.loads(data[offset:offset + length].decode('utf-8')) == element
+        elements[key] = element
+    assert elements == struct_1c
+    assert list(elements) == list(struct_1c)
+
+
+def test_lazy_struct_payload(tmp_path):
+    file_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(file_path, STRUCT_1C, 4, True)
+    for key, element, offset, length in iter_1c_database_struct(file_path, 7):
+        payload: LazyStructPayload = LazyStructPayload(file_path, offset, length, 'fields')
+        assert dict(payload) == STRUCT_1C[key]['fields']
+        assert pickle.loads(pickle.dumps(payload)) == STRUCT_1C[key]['fields']
+
+
+@pytest.mark.parametrize('data', [b'', b'{"config": {"a": 1}', b'{"config": ', b'["config"]'])
+def test_iter_1c_database_struct_invalid(tmp_path, data):
+    file_path: str = str(tmp_path / 'struct.json')
+    with open(file_path, 'wb') as file:
+        file.write(data)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_1c_database_struct(file_path, 4))
+
+
+def test_iter_1c_database_struct_empty_object(tmp_path):
+    file_path: str = str(tmp_path / 'struct.json')
+    with open(file_path, 'wb') as file:
+        file.write(b' { } ')
+    assert list(iter_1c_database_struct(file_path, 1)) == []
+
+
+@pytest.mark.parametrize('payloads', ['load', 'lazy', 'skip'])
+def test_struct_1c_cache(tmp_path, payloads):
+    file_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(file_path, STRUCT_1C, 4, True)
+    Struct1CCache(file_path).close()
+    cache: Struct1CCache = Struct1CCache(file_path, payloads)
+    assert len(cache) == len(STRUCT_1C)
+    assert list(cache) == list(STRUCT_1C)
+    assert 'missing' not in cache
+    for key, element in STRUCT_1C.items():
+        cached: dict = cache[key]
+        assert cached is cache[key]
+        for name, value in element.items():
+            if name not in PAYLOAD_NAMES:
+                assert cached[name] == value
+            elif payloads == 'skip' or len(value) == 0:
+                assert name not in cached
+            else:
+                assert dict(cached[name]) == value
+                assert pickle.loads(pickle.dumps(cached[name])) == value
+    cache.close()
+
+
+def test_struct_1c_cache_file_format(tmp_path):
+    file_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(file_path, STRUCT_1C)
+    cache_path: str = Struct1CCache(file_path).cache_path
+    stat: os.stat_result = os.stat(file_path)
+    with open(cache_path, 'rb') as file:
+        data: bytes = file.read()
+    header_struct: struct.Struct = struct.Struct('<8sQQ32sQQ')
+    magic, size, mtime_ns, digest, count, keys_length = header_struct.unpack_from(data, 0)
+    assert magic == b'DBSA1C' + bytes((2, marshal.version))
+    assert (size, mtime_ns, count) == (stat.st_size, stat.st_mtime_ns, len(STRUCT_1C))
+    assert digest == get_file_digest(file_path)
+    keys: list = json.loads(data[header_struct.size:header_struct.size + keys_length].decode('utf-8'))
+    assert keys == list(STRUCT_1C)
+    offsets_start: int = header_struct.size + keys_length
+    for index, key in enumerate(keys):
+        offset: int = struct.unpack_from('<Q', data, offsets_start + 8 * index)[0]
+        flags, element_length, payloads_length = struct.unpack_from('<BII', data, offset)
+        element_start: int = offset + struct.calcsize('<BII')
+        element: dict = marshal.loads(data[element_start:element_start + element_length])
+        payloads: dict = marshal.loads(data[element_start + element_length:
+                                            element_start + element_length + payloads_length]) if flags else {}
+        expected: dict = {name: value for name, value in STRUCT_1C[key].items() if name not in PAYLOAD_NAMES}
+        assert element == expected
+        assert payloads == {name: STRUCT_1C[key][name] for name in PAYLOAD_NAMES if len(STRUCT_1C[key][name]) > 0}
+        assert flags == sum(1 << bit for bit, name in enumerate(PAYLOAD_NAMES) if name in payloads)
+
+
+def test_struct_1c_cache_is_rebuilt(tmp_path):
+    file_path: str = str(tmp_path / 'struct.json')
+    write_struct_1c(file_path, STRUCT_1C)
+    cache_path: str = Struct1CCache(file_path).cache_path
+    with open(cache_path, 'rb') as file:
+        data: bytes = file.read()
+    stat: os.stat_result = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache: Struct1CCache = Struct1CCache(file_path)
+    cache.close()
+    with open(cache_path, 'rb') as file:
+        touched_data: bytes = file.read()
+    assert struct.unpack_from('<Q', touched_data, 16)[0] == stat.st_mtime_ns + 10 ** 9
+    assert touched_data[:16] + touched_data[24:] == data[:16] + data[24:]
+    with open(file_path, 'ab') as file:
+        file.write(b'\n')
+    with open(file_path, 'r+b') as file:
+        data: bytes = file.read().replace(b'"config"', b'"params"')
+        file.seek(0)
+        file.write(data)
+    cache = Struct1CCache(file_path)
+    assert 'params' in cache
+    assert 'config' not in cache
+    cache.close()
+    with open(cache_path, 'r+b') as file:
+        file.write(b'DBSA1C\x01\x00')
+    cache = Struct1CCache(file_path)
+    assert cache['params']['purpose'] == ''
+    cache.close()